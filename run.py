@@ -12,8 +12,8 @@ if __name__ == "__main__":
                         help="The path of dataset")
     parser.add_argument('-c', '--correct', action='store_true', default=False,
                         help="Use correct programs")
-    parser.add_argument('-t', '--timeout', type=int, default=1,
-                        help="Set timeout for compile program, default is 1sec")
+    parser.add_argument('-t', '--timeout', type=float, default=1,
+                        help="Set timeout for compile program in seconds (e.g., 0.05), default is 1sec")
     parser.add_argument('-g', '--generations', type=int, default=30,
                         help="Number of generations, default is 30")
     parser.add_argument('-e', '--executions', type=int, default=1,
@@ -24,6 +24,30 @@ if __name__ == "__main__":
                         help="Select approach to run, e.g., 'mentored', 'pydex'")
     parser.add_argument('-m', '--multiprocess', action='store_true', default=False,
                         help="Run with multiprocessing")
+    parser.add_argument('-b', '--backend', type=str, default='serial',
+                        help="Select test execution backend, e.g., 'serial', 'pool', 'thread'")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Number of workers for 'pool' and 'thread' backend, default is cpu count")
+    parser.add_argument('-s', '--batch', action='store_true', default=False,
+                        help="Compile each program once for all test cases")
+    parser.add_argument('-k', '--cache', type=str, default=None,
+                        help="Directory of persistent trace cache shared across runs")
+    parser.add_argument('-l', '--tracer', type=str, default='settrace',
+                        help="Select line tracer, e.g., 'settrace', 'monitoring', 'instrument'")
+    parser.add_argument('-i', '--isolation', type=str, default='signal',
+                        help="Select timeout enforcement, e.g., 'signal', 'fork'")
+    parser.add_argument('-x', '--memory', type=int, default=None,
+                        help="Memory limit (MB) of each test run for 'fork' isolation")
+    parser.add_argument('-f', '--fitness-workers', type=int, default=None,
+                        help="Number of processes computing the fitness matrix of selection, default is serial")
+    parser.add_argument('-z', '--fitness-cache', type=int, default=None,
+                        help="Max number of cached fitness scores of a trial, default is 65536")
+    parser.add_argument('--trace-limit', type=int, default=100,
+                        help="Max number of traced events of each test run, default is 100")
+    parser.add_argument('--value-limit', type=int, default=1000,
+                        help="Max number of recorded values of each variable in a test run, default is 1000")
+    parser.add_argument('--repr-limit', type=int, default=1000,
+                        help="Max length of each recorded value, default is 1000")
     args = parser.parse_args()
 
     dataset = args.dataset
@@ -34,6 +58,18 @@ if __name__ == "__main__":
     approach = args.approach.lower()
     multi = args.multiprocess
     reset = args.reset
+    backend = args.backend.lower()
+    workers = args.workers
+    batch = args.batch
+    cache_dir = args.cache
+    tracer = args.tracer.lower()
+    isolation = args.isolation.lower()
+    memory_limit = args.memory
+    fitness_workers = args.fitness_workers
+    fitness_cache_size = args.fitness_cache
+    trace_limit = args.trace_limit
+    value_limit = args.value_limit
+    repr_limit = args.repr_limit
     
     assert os.path.isdir(dataset), "Wrong directory"
     datasets = glob.glob(f'{dataset}/**/dataset.json', recursive=True)
@@ -44,8 +80,19 @@ if __name__ == "__main__":
         raise ValueError("Invalid approach, choose 'mentored' or 'pydex'")
     if approach == 'pydex' and multi:
         raise ValueError("gpt api of 'pydex' approach doesn't support multiprocessing")
+    if backend not in ['serial', 'pool', 'thread']:
+        raise ValueError("Invalid backend, choose 'serial', 'pool' or 'thread'")
+    if tracer not in ['settrace', 'monitoring', 'instrument']:
+        raise ValueError("Invalid tracer, choose 'settrace', 'monitoring' or 'instrument'")
+    if isolation not in ['signal', 'fork']:
+        raise ValueError("Invalid isolation, choose 'signal' or 'fork'")
+    if memory_limit is not None and isolation != 'fork':
+        raise ValueError("Memory limit is only supported by 'fork' isolation")
 
-    ex = Experiments(generations, trials, correct, timeout, approach, multi, reset)
+    ex = Experiments(generations, trials, correct, timeout, approach, multi, reset, 
+                     backend, workers, batch, cache_dir, tracer, 
+                     isolation, memory_limit, fitness_workers, fitness_cache_size,
+                     trace_limit, value_limit, repr_limit)
     for dataset in datasets:
         ex.run(dataset)
     
\ No newline at end of file
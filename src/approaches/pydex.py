@@ -164,7 +164,6 @@ class PYDEX:
                         try:
                             # Check the patch is solution
                             origin_w_id = wrong_id.rsplit("_", 1)[0]
-                            p_test_hist = Tester.validation(patch)
-                            if Tester.is_all_pass(p_test_hist):
+                            if Tester.is_solution(patch):
                                 self.log.update({'solution':True})
                         except: pass
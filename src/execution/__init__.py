@@ -1,6 +1,8 @@
 from .results import Results
+from .execTrace import ExecTrace
 from .tester import Tester
 from .unittests import Running, Tracing, RunUnitTest, UnitTestStatus
-from .tracer import Tracer
+from .tracer import Tracer, MonitoringTracer, InstrumentTracer
+from .coverageMatrix import CoverageMatrix
 from .faultLocalization import FaultLocalization
 from .codeQuality import CodeQuality
\ No newline at end of file
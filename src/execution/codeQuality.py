@@ -12,7 +12,7 @@ class CodeQuality:
     def check(code:str) -> float:
         total = 0
         for testcase in Tester.testsuite:
-            test_code = Tester.gen_test_code(code, testcase.input)
+            test_code = Tester.gen_test_code(code, testcase)
             test_code += "\n"
             with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as tmp_file:
                 tmp_file.write(test_code.encode('utf-8'))
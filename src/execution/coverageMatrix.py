@@ -0,0 +1,43 @@
+import numpy as np
+
+from .unittests import UnitTestStatus
+
+
+class CoverageMatrix:
+    # (tests x lines) executed lines of each testcase and the failed testcases
+    def __init__(self, test_hist:dict, trace_hist:dict):
+        # Same order of lines as a set filled line by line, testcase by testcase
+        lines = set()
+        for no in test_hist.keys():
+            for lineno in trace_hist[no].lines():
+                lines.add(lineno)
+        self.lines = list(lines)
+        index = {lineno:i for i, lineno in enumerate(self.lines)}
+        self.matrix = np.zeros((len(test_hist), len(self.lines)), dtype=bool)
+        for t, no in enumerate(test_hist.keys()):
+            self.matrix[t, [index[lineno] for lineno in trace_hist[no].lines()]] = True
+        self.failed = np.array([status != UnitTestStatus.success
+                                for status in test_hist.values()], dtype=bool)
+
+    @property
+    def fail_cnts(self) -> np.ndarray:
+        return self.matrix[self.failed].sum(axis=0)
+
+    @property
+    def pass_cnts(self) -> np.ndarray:
+        return self.matrix[~self.failed].sum(axis=0)
+
+    @property
+    def exec_cnts(self) -> np.ndarray:
+        return self.matrix.sum(axis=0)
+
+    @property
+    def total_fail(self) -> int:
+        return int(self.failed.sum())
+
+    @property
+    def total_pass(self) -> int:
+        return int((~self.failed).sum())
+
+    def to_dict(self, scores) -> dict:
+        return {lineno:score for lineno, score in zip(self.lines, scores)}
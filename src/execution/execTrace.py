@@ -0,0 +1,114 @@
+from array import array
+
+
+class ExecTrace:
+    # Run-length compressed execution trace, a repeated segment (e.g. a loop body)
+    # is kept once with its count. Appended lines are compressed every chunk_size lines,
+    # so a trace holds at most chunk_size raw lines besides its runs.
+    chunk_size = 256
+    max_period = 32
+
+    def __init__(self, traces=()):
+        self.segments = []
+        self.counts = []
+        self.tail = array('i')
+        self.length = 0
+        # The run had more lines than the trace limit
+        self.truncated = False
+        self.extend(traces)
+
+    def append(self, lineno:int):
+        self.tail.append(lineno)
+        self.length += 1
+        if len(self.tail) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, traces):
+        for lineno in traces:
+            self.append(lineno)
+
+    def flush(self):
+        # Compress the raw lines of the tail
+        for segment, count in self.compress(self.tail):
+            self.__add_run(segment, count)
+        self.tail = array('i')
+
+    def __add_run(self, segment:array, count:int):
+        if self.segments and self.segments[-1] == segment:
+            self.counts[-1] += count
+        elif self.segments and count == 1 and self.counts[-1] == 1:
+            # Literals next to each other are one segment
+            self.segments[-1].extend(segment)
+        else:
+            self.segments.append(segment)
+            self.counts.append(count)
+
+    @classmethod
+    def compress(cls, seq:array) -> list[tuple[array, int]]:
+        # Greedy: at each position take the period which covers the most repeated lines
+        runs = []
+        literal = array('i')
+        i, n = 0, len(seq)
+        while i < n:
+            best_period, best_count = 1, 1
+            for period in range(1, min(cls.max_period, (n - i) // 2) + 1):
+                segment = seq[i:i+period]
+                count = 1
+                while seq[i+count*period:i+(count+1)*period] == segment:
+                    count += 1
+                if count > 1 and count * period > best_count * best_period:
+                    best_period, best_count = period, count
+            if best_count > 1:
+                if literal:
+                    runs.append((literal, 1))
+                    literal = array('i')
+                runs.append((seq[i:i+best_period], best_count))
+                i += best_period * best_count
+            else:
+                literal.append(seq[i])
+                i += 1
+        if literal:
+            runs.append((literal, 1))
+        return runs
+
+    def runs(self) -> list[tuple[array, int]]:
+        runs = list(zip(self.segments, self.counts))
+        if self.tail:
+            runs.append((self.tail, 1))
+        return runs
+
+    def lines(self) -> set:
+        # Distinct executed lines without expanding the runs
+        return set(self.first_seen())
+
+    def first_seen(self) -> list:
+        # Distinct executed lines in the order of their first execution
+        seen = {}
+        for segment, _ in self.runs():
+            for lineno in segment:
+                seen.setdefault(lineno, None)
+        return list(seen)
+
+    def __iter__(self):
+        for segment, count in self.runs():
+            for _ in range(count):
+                yield from segment
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (ExecTrace, list, tuple)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        items = []
+        for segment, count in self.runs():
+            if count == 1:
+                items.extend(str(lineno) for lineno in segment)
+            else:
+                items.append(f'{segment.tolist()}*{count}')
+        if self.truncated:
+            items.append('...')
+        return f"[{', '.join(items)}]"
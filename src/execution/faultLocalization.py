@@ -1,6 +1,11 @@
+import numpy as np
+from collections import deque
 from sklearn.preprocessing import MinMaxScaler
 
 from .tester import Tester
+from .coverageMatrix import CoverageMatrix
+
+from ..utils import Truncated
 
 class FaultLocalization:
     def get_nth_fl(self, suspiciousness:dict, n:int=1):
@@ -16,66 +21,43 @@ class FaultLocalization:
         return fl_list
 
     def trantula(self, test_hist:dict, trace_hist:dict) -> dict:
-        total_pass = 0
-        total_fail = 0
-        pass_cnt_dict = {}
-        fail_cnt_dict = {}
-        lines = set()
-
-        for no, status in test_hist.items():
-            for lineno in set(trace_hist[no]):
-                lines.add(lineno)
-                if not Tester.is_pass(status):
-                    total_fail += 1
-                    fail_cnt_dict.setdefault(lineno, 0)
-                    fail_cnt_dict[lineno] += 1
-                else:
-                    total_pass += 1
-                    pass_cnt_dict.setdefault(lineno, 0)
-                    pass_cnt_dict[lineno] += 1
-        
-        suspiciousness = {}
-        for lineno in lines:
-            pass_cnt = pass_cnt_dict[lineno] if lineno in pass_cnt_dict.keys() else 0
-            fail_cnt = fail_cnt_dict[lineno] if lineno in fail_cnt_dict.keys() else 0
-            score = 0
-            try: score = round((fail_cnt / total_fail) / ((fail_cnt / total_fail) + (pass_cnt / total_pass)), 1)
-            except ZeroDivisionError:
-                if fail_cnt > 0 and pass_cnt == 0:
-                    score = 1
-            suspiciousness[lineno] = score
-        
-        return suspiciousness
+        cm = CoverageMatrix(test_hist, trace_hist)
+        fail_cnts, pass_cnts = cm.fail_cnts, cm.pass_cnts
+        # Totals are the executed lines of failed/passed testcases
+        total_fail = int(cm.matrix[cm.failed].sum())
+        total_pass = int(cm.matrix[~cm.failed].sum())
+        if total_fail == 0 or total_pass == 0:
+            scores = [1 if fail_cnt > 0 and pass_cnt == 0 else 0 
+                      for fail_cnt, pass_cnt in zip(fail_cnts, pass_cnts)]
+            return cm.to_dict(scores)
+        fail_ratios = fail_cnts / total_fail
+        scores = fail_ratios / (fail_ratios + pass_cnts / total_pass)
+        return cm.to_dict(round(float(score), 1) for score in scores)
     
     def jaccard(self, test_hist:dict, trace_hist:dict) -> dict:
-        total_fail = 0
-        exec_cnt_dict = {}
-        fail_cnt_dict = {}
-        lines = set()
-
-        for no, status in test_hist.items():
-            if not Tester.is_pass(status):
-                total_fail += 1
-            for lineno in set(trace_hist[no]):
-                lines.add(lineno)
-                exec_cnt_dict.setdefault(lineno, 0)
-                exec_cnt_dict[lineno] += 1
-                if not Tester.is_pass(status):
-                    fail_cnt_dict.setdefault(lineno, 0)
-                    fail_cnt_dict[lineno] += 1
-        
-        suspiciousness = {}
-        for lineno in lines:
-            exec_cnt = exec_cnt_dict[lineno] if lineno in exec_cnt_dict.keys() else 0
-            fail_cnt = fail_cnt_dict[lineno] if lineno in fail_cnt_dict.keys() else 0
-            score = 0
-            try: score = round((fail_cnt / (exec_cnt + (total_fail - fail_cnt))), 1)
-            except ZeroDivisionError:
-                if fail_cnt > 0 and exec_cnt == 0:
-                    score = 1
-            suspiciousness[lineno] = score
-        
-        return suspiciousness
+        cm = CoverageMatrix(test_hist, trace_hist)
+        fail_cnts = cm.fail_cnts
+        # Executed lines are executed by one testcase at least
+        scores = fail_cnts / (cm.exec_cnts + (cm.total_fail - fail_cnts))
+        return cm.to_dict(round(float(score), 1) for score in scores)
+    
+    def ochiai(self, test_hist:dict, trace_hist:dict) -> dict:
+        cm = CoverageMatrix(test_hist, trace_hist)
+        fail_cnts = cm.fail_cnts
+        denominators = np.sqrt(cm.total_fail * cm.exec_cnts)
+        scores = np.divide(fail_cnts, denominators, 
+                           out=np.zeros(len(cm.lines)), where=denominators > 0)
+        return cm.to_dict(round(float(score), 1) for score in scores)
+    
+    def dstar(self, test_hist:dict, trace_hist:dict, star:int=2) -> dict:
+        cm = CoverageMatrix(test_hist, trace_hist)
+        fail_cnts = cm.fail_cnts
+        denominators = cm.pass_cnts + (cm.total_fail - fail_cnts)
+        # Lines executed by every failed and no passed testcase are the most suspicious
+        scores = np.where(denominators > 0, 
+                          fail_cnts ** star / np.maximum(denominators, 1), 
+                          fail_cnts ** star)
+        return cm.to_dict(round(float(score), 1) for score in scores)
     
     
     def vsusfl(self, test_hist1:dict, vari_hist1:dict, trace_hist1:dict, 
@@ -90,11 +72,13 @@ class FaultLocalization:
 
             vvs1 = vari_hist1[tc_id]
             vvs1_line_var_map = {}
+            vvs1_line_values_map = {}
             for var, values in vvs1.items():
                 for data in values:
                     lineno = data[1]
                     vvs1_line_var_map.setdefault(lineno, set())
                     vvs1_line_var_map[lineno].add(var)
+                    vvs1_line_values_map.setdefault((var, lineno), []).append(data[0])
 
             vvs2 = vari_hist2[tc_id]
             vvs2_line_var_map = {}
@@ -103,6 +87,14 @@ class FaultLocalization:
                     lineno2 = data[1]
                     vvs2_line_var_map.setdefault(lineno2, {})
                     vvs2_line_var_map[lineno2].setdefault(var2, []).append(data[0])
+            # Lines of each var2 by its values at the line, in the order of lines
+            vvs2_value_line_map = {}
+            for lineno2, var_value_dict2 in vvs2_line_var_map.items():
+                for var2, values2 in var_value_dict2.items():
+                    # Truncated values are unknown, neither same nor different
+                    if self.__has_truncated(values2): continue
+                    vvs2_value_line_map.setdefault(var2, {})
+                    vvs2_value_line_map[var2].setdefault(tuple(values2), deque()).append(lineno2)
             
             for lineno in traces1:
                 suspiciousness.setdefault(lineno, 0)
@@ -116,14 +108,13 @@ class FaultLocalization:
                     found = False
                     var2 = var_map[var1]
                     if var2 not in vvs2.keys(): continue
-                    values1 = [item[0] for item in vvs1[var1] if item[1] == lineno]
-                    for lineno2, var_value_dict2 in vvs2_line_var_map.items():
-                        if var2 not in var_value_dict2.keys(): continue
-                        values2 = var_value_dict2[var2]
-                        if values1 == values2:
-                            del vvs2_line_var_map[lineno2][var2]
-                            found = True
-                            break
+                    values1 = vvs1_line_values_map[(var1, lineno)]
+                    if self.__has_truncated(values1): continue
+                    # The first line of var2 with same values is used once
+                    lines2 = vvs2_value_line_map.get(var2, {}).get(tuple(values1))
+                    if lines2:
+                        lines2.popleft()
+                        found = True
                     
                     if found:
                         if Tester.is_pass(status1) and Tester.is_pass(status2):
@@ -146,11 +137,15 @@ class FaultLocalization:
         return suspiciousness
 
 
+    def __has_truncated(self, values:list) -> bool:
+        return any(isinstance(value, Truncated) for value in values)
+
     def run_core(self, test_hist:dict, trace_hist:dict, formula:str="jaccard") -> dict:
-        if formula == "trantula":
-            suspiciousness = self.trantula(test_hist, trace_hist)
-        elif formula == "jaccard":
-            suspiciousness = self.jaccard(test_hist, trace_hist)
+        formulas = {"trantula": self.trantula, "jaccard": self.jaccard,
+                    "ochiai": self.ochiai, "dstar": self.dstar}
+        if formula not in formulas.keys():
+            raise ValueError("Invalid formula, choose 'trantula', 'jaccard', 'ochiai' or 'dstar'")
+        suspiciousness = formulas[formula](test_hist, trace_hist)
         return suspiciousness
     
     def run(self, code:str, formula:str="jaccard") -> dict:
@@ -0,0 +1,51 @@
+import ast
+
+from ..transform import NodeParser
+
+DRIVER = '<driver>'
+
+
+class Program:
+    # Candidate program which is parsed and compiled once for all testcases
+    def __init__(self, code:str):
+        from ..utils import CodeCache
+        self.code = CodeCache.regularize(code)
+        self.node_parser = CodeCache.node_parser(self.code)
+        self.handle_code, self.changed_line_map = CodeCache.handle(self.code)
+        self.code_obj = CodeCache.compile(self.handle_code)
+        self.end_line = len(self.code.splitlines())
+        self.traced_code_objs = {}
+
+    def traced_code(self, tracer):
+        # Instrumenting tracers need their own compiled program
+        if not tracer.instrument:
+            return self.code_obj
+        if tracer not in self.traced_code_objs:
+            from ..utils import CodeCache
+            self.traced_code_objs[tracer] = CodeCache.compile(self.handle_code, compiler=tracer.compile)
+        return self.traced_code_objs[tracer]
+
+
+class Driver:
+    # Testcase input which is executed after the program in the same globals
+    def __init__(self, source:str):
+        self.source = source
+        from ..utils import CodeCache
+        self.code_obj = CodeCache.compile(source, DRIVER)
+        self.traced_code_objs = {}
+
+    def traced_code(self, tracer):
+        if not tracer.instrument:
+            return self.code_obj
+        if tracer not in self.traced_code_objs:
+            from ..utils import CodeCache
+            self.traced_code_objs[tracer] = CodeCache.compile(self.source, DRIVER, tracer.compile)
+        return self.traced_code_objs[tracer]
+
+    def call_line_map(self, program:Program) -> dict:
+        # Driver lines are numbered after the program like in the test code
+        tree = ast.increment_lineno(ast.parse(self.source), program.end_line)
+        node_parser = NodeParser()
+        node_parser.object_line_node_dict = dict(program.node_parser.object_line_node_dict)
+        node_parser.run(tree=tree)
+        return program.node_parser.objectCall_line_dict | node_parser.objectCall_line_dict
@@ -1,30 +1,30 @@
-class Results:
-    exec_traces = []
-    vari_traces = {}
-    vari_names = []
-    line_vars_map = {}
-    changed_line_map = {}
-    status = None
-    timeout = 1
-    test_code = ''
-    input = ''
-    output = ''
-    stdout = None
-    globals = None
-    end_line = 0
+from .execTrace import ExecTrace
+
 
-    @classmethod
-    def init_global_vars(cls):
-        cls.exec_traces = []
-        cls.vari_traces = {}
-        cls.vari_names = []
-        cls.line_vars_map = {}
-        cls.changed_line_map = {}
-        cls.status = None
-        cls.timeout = 1
-        cls.test_code = ''
-        cls.input = ''
-        cls.output = ''
-        cls.stdout = None
-        cls.globals = None
-        cls.end_line = 0
\ No newline at end of file
+class Results:
+    # Context of a single evaluation, every run of a program owns one
+    def __init__(self, timeout:float=1, input:str='', output:str='',
+                 tracer=None, isolation:str='signal', memory_limit:int=None,
+                 trace_limit:int=100, value_limit:int=1000, repr_limit:int=1000):
+        self.exec_traces = ExecTrace()
+        self.vari_traces = {}
+        self.vari_names = []
+        self.line_vars_map = {}
+        self.changed_line_map = {}
+        self.status = None
+        self.timeout = timeout
+        self.test_code = ''
+        self.driver_code = None
+        self.input = input
+        self.output = output
+        self.stdout = None
+        self.globals = None
+        self.end_line = 0
+        self.tracer = tracer
+        self.isolation = isolation
+        self.memory_limit = memory_limit
+        self.elapsed = 0.0
+        # Caps of a traced run, see Tracer
+        self.trace_limit = trace_limit
+        self.value_limit = value_limit
+        self.repr_limit = repr_limit
@@ -0,0 +1,72 @@
+import os
+import math
+import time
+import pickle
+import select
+import signal
+import resource
+
+
+class Sandbox:
+    # Run a function in a forked child with wall-clock, cpu and memory limits
+    def __init__(self, timeout:float=1, memory_limit:int=None, grace:float=0.1):
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.grace = grace
+
+    def __set_limits(self):
+        cpu = math.ceil(self.timeout) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+        if self.memory_limit:
+            # Forked child already maps the whole tester, limit what the program adds
+            memory = self.__address_space() + self.memory_limit * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+    def __address_space(self) -> int:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+
+    def __child(self, func, fd:int):
+        data = b''
+        try:
+            self.__set_limits()
+            data = pickle.dumps(func(), protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            pass
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+        finally:
+            os._exit(0)
+
+    def __read(self, fd:int, deadline:float) -> bytes:
+        chunks = []
+        with os.fdopen(fd, 'rb', buffering=0) as f:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                readable, _, _ = select.select([f], [], [], remaining)
+                if not readable:
+                    return None
+                chunk = f.read(65536)
+                if not chunk:
+                    return b''.join(chunks)
+                chunks.append(chunk)
+
+    def run(self, func):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            self.__child(func, write_fd)
+        os.close(write_fd)
+        # The child stops itself at timeout, kill it only when it is stuck
+        deadline = time.monotonic() + self.timeout + self.grace
+        data = self.__read(read_fd, deadline)
+        if data is None:
+            os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        if not data:
+            return None
+        return pickle.loads(data)
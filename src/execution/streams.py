@@ -0,0 +1,50 @@
+import sys
+import threading
+
+
+class LocalStream:
+    # Process-wide standard stream which forwards to the stream of the current thread's run
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def get(self):
+        stream = getattr(self.local, 'stream', None)
+        return self.default if stream is None else stream
+
+    def set(self, stream):
+        self.local.stream = stream
+
+    def __getattr__(self, name:str):
+        return getattr(self.get(), name)
+
+    def __iter__(self):
+        return iter(self.get())
+
+    def __next__(self):
+        return next(self.get())
+
+
+class Streams:
+    names = ['stdin', 'stdout', 'stderr']
+    lock = threading.Lock()
+
+    @classmethod
+    def install(cls):
+        with cls.lock:
+            for name in cls.names:
+                if not isinstance(getattr(sys, name), LocalStream):
+                    setattr(sys, name, LocalStream(getattr(sys, name)))
+
+    @classmethod
+    def redirect(cls, stdin, stdout, stderr):
+        cls.install()
+        for name, stream in zip(cls.names, [stdin, stdout, stderr]):
+            getattr(sys, name).set(stream)
+
+    @classmethod
+    def restore(cls):
+        for name in cls.names:
+            stream = getattr(sys, name)
+            if isinstance(stream, LocalStream):
+                stream.set(None)
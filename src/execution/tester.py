@@ -1,29 +1,112 @@
+import os
+import sys
+import time
 from functools import cache
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 warnings.filterwarnings("ignore")
 
 from .results import Results
+from .execTrace import ExecTrace
 from .testsuite import TestSuite
 from .unittests import Running, Tracing, RunUnitTest, UnitTestStatus
+from .workerPool import WorkerPool
+from .program import Program
+from .traceCache import TraceCache
+from .tracer import Tracer, MonitoringTracer, InstrumentTracer
 
-from ..transform import NodeParser, ExceptHandler
+from ..transform import NodeParser
 
 
 class Tester:
     testsuite = None
     timeout = 1
+    isolation = 'signal'
+    memory_limit = None
+    trace_limit = 100
+    value_limit = 1000
+    repr_limit = 1000
+    backend = 'serial'
+    batch = False
+    pool = None
+    executor = None
+    disk_cache = None
+    # Test outcomes of the programs traced, validated or checked in this process
+    test_hists = {}
+    global_data = {}
+    tracer = Tracer
+    tracers = {'settrace': Tracer, 
+               'monitoring': MonitoringTracer, 
+               'instrument': InstrumentTracer}
     
     @classmethod
     def clear(cls):
         cls.trace.cache_clear()
         cls.validation.cache_clear()
+        cls.is_solution.cache_clear()
+        cls.compile.cache_clear()
+        cls.test_hists = {}
         
     @classmethod
-    def init_global_data(cls, testcases:list, timeout:int=1):
+    def init_global_data(cls, testcases:list, timeout:int=1, 
+                         backend:str='serial', workers:int=None,
+                         batch:bool=False, cache_dir:str=None, 
+                         tracer:str='settrace', isolation:str='signal',
+                         memory_limit:int=None, trace_limit:int=100, 
+                         value_limit:int=1000, repr_limit:int=1000):
+        if backend not in ['serial', 'pool', 'thread']:
+            raise ValueError("Invalid backend, choose 'serial', 'pool' or 'thread'")
+        if tracer not in cls.tracers.keys():
+            raise ValueError("Invalid tracer, choose 'settrace', 'monitoring' or 'instrument'")
+        if tracer == 'monitoring' and not hasattr(sys, 'monitoring'):
+            raise ValueError("'monitoring' tracer requires python >= 3.12")
+        if isolation not in ['signal', 'fork']:
+            raise ValueError("Invalid isolation, choose 'signal' or 'fork'")
+        if isolation == 'fork' and not hasattr(os, 'fork'):
+            raise ValueError("'fork' isolation requires a POSIX system")
+        if isolation == 'fork' and backend == 'thread':
+            raise ValueError("'fork' isolation is not supported by 'thread' backend")
+        cls.shutdown()
+        # Settings to set up the same Tester in other processes
+        cls.global_data = {'testcases': testcases, 'timeout': timeout, 
+                           'batch': batch, 'cache_dir': cache_dir, 'tracer': tracer, 
+                           'isolation': isolation, 'memory_limit': memory_limit,
+                           'trace_limit': trace_limit, 'value_limit': value_limit, 
+                           'repr_limit': repr_limit}
         cls.testsuite = TestSuite(testcases)
         cls.timeout = timeout
+        cls.isolation = isolation
+        cls.memory_limit = memory_limit
+        cls.trace_limit = trace_limit
+        cls.value_limit = value_limit
+        cls.repr_limit = repr_limit
+        cls.backend = backend
+        cls.batch = batch
+        cls.tracer = cls.tracers[tracer]
+        if backend == 'pool':
+            cls.pool = WorkerPool(testcases, timeout, workers, batch, tracer,
+                                  isolation, memory_limit, 
+                                  trace_limit, value_limit, repr_limit)
+        if backend == 'thread':
+            cls.executor = ThreadPoolExecutor(workers)
+        if cache_dir is not None:
+            # Traces of other limits are not the same
+            version = f'{cls.tracer.version}:{trace_limit}:{value_limit}:{repr_limit}'
+            cls.disk_cache = TraceCache(cache_dir, cls.testsuite, timeout, version)
         cls.clear()
     
+    @classmethod
+    def shutdown(cls):
+        if cls.pool is not None:
+            cls.pool.close()
+            cls.pool = None
+        if cls.executor is not None:
+            cls.executor.shutdown()
+            cls.executor = None
+        if cls.disk_cache is not None:
+            cls.disk_cache.close()
+            cls.disk_cache = None
+    
     @classmethod
     def split_test_hist(cls, test_hist:dict) -> list:
         passed_tc_list = [tc_id for tc_id, result in test_hist.items() if result == UnitTestStatus.success]
@@ -67,112 +150,230 @@ class Tester:
         return cls.testsuite.print_testcase(idx)
     
     @classmethod
-    def gen_test_code(cls, code:str, input:str, key_input:bool=False) -> str:
-        from ..utils import Regularize
-        try:
-            test_input = input
-            if 'print(' not in input:
-                test_input = 'print(' + input + ')'
-            Regularize.run(input)
-            Regularize.run(test_input)
-        except:
-            key_input = True
+    def gen_driver(cls, testcase, key_input:bool=False) -> str:
+        # Programs reading key input have no driver
+        if key_input or testcase.key_input:
+            return None
+        return testcase.driver_source
+    
+    @classmethod
+    def gen_test_code(cls, code:str, testcase, key_input:bool=False) -> str:
+        from ..utils import CodeCache
+        driver = cls.gen_driver(testcase, key_input)
 
         test_code = code.strip()
-        if not key_input:
-            if 'print(' not in input:
-                input = 'print(' + input + ')'
-            test_code = code + '\n\n' + input
+        if driver is not None:
+            test_code = code + '\n\n' + driver
 
-        return Regularize.run(test_code)
+        return CodeCache.regularize(test_code)
     
     @classmethod
-    def __fix_exec_traces(cls, node_parser:NodeParser, test_code:str):
+    @cache
+    def compile(cls, code:str) -> Program:
+        return Program(code)
+    
+    @classmethod
+    def __fix_exec_traces(cls, results:Results, node_parser:NodeParser, 
+                          object_line_node_dict:dict, 
+                          objectCall_line_dict:dict):
         # Set execution traces to before error line when it has compile error
-        if Results.status == UnitTestStatus.error:
-            if Results.exec_traces:
+        if results.status == UnitTestStatus.error:
+            if results.exec_traces:
                 pass
             else:
-                for lineno in node_parser.line_node_map.keys():
-                    Results.exec_traces.append(lineno)
-                Results.exec_traces.sort()
+                results.exec_traces = ExecTrace(sorted(node_parser.line_node_map.keys()))
         else:
-            node_parser = NodeParser()
-            node_parser.run(test_code)
-            new_exec_traces = []
-            for lineno in Results.exec_traces:
-                if lineno in node_parser.object_line_node_dict.keys(): continue
-                if lineno <= Results.end_line:
+            new_exec_traces = ExecTrace()
+            for lineno in results.exec_traces:
+                if lineno in object_line_node_dict.keys(): continue
+                if lineno <= results.end_line:
                     new_exec_traces.append(lineno)
-                if lineno in node_parser.objectCall_line_dict.keys():
-                    new_exec_traces.append(node_parser.objectCall_line_dict[lineno])
-            Results.exec_traces = new_exec_traces
+                if lineno in objectCall_line_dict.keys():
+                    new_exec_traces.append(objectCall_line_dict[lineno])
+            new_exec_traces.truncated = results.exec_traces.truncated
+            results.exec_traces = new_exec_traces
+        results.exec_traces.flush()
                     
     @classmethod
-    def __fix_vari_values(cls):
-        for var, vvs_set in Results.vari_traces.items():
-            new_vvs = []
-            for (value, lineno) in vvs_set:
-                try: value = eval(value)
-                except: pass
-                new_vvs.append((value, lineno))
-            Results.vari_traces[var] = new_vvs
+    def new_results(cls, input:str, output:str) -> Results:
+        return Results(cls.timeout, input, output, cls.tracer, 
+                       cls.isolation, cls.memory_limit, 
+                       cls.trace_limit, cls.value_limit, cls.repr_limit)
     
     @classmethod
-    def run(cls, code:str, input:str, output:str, UnitTest=Running) -> tuple[str, str]:
-        from ..utils import Regularize
+    def run(cls, code:str, testcase, UnitTest=Running) -> Results:
+        from ..utils import CodeCache
         
-        code = Regularize.run(code)
-        Results.init_global_vars()
-        np = NodeParser()
-        np.run(code)
-        test_code = cls.gen_test_code(code, input, np.key_input)
-        eh = ExceptHandler()
-        handle_code = eh.run(test_code)
-        Results.changed_line_map = eh.new_line_map
-        Results.vari_names = np.var_name_list
-        Results.line_vars_map = np.line_vars_map
-        Results.timeout = cls.timeout
-        Results.input = input
-        Results.output = output
-        Results.test_code = handle_code
-        Results.end_line = len(code.splitlines())
+        code = CodeCache.regularize(code)
+        results = cls.new_results(testcase.input, testcase.output)
+        np = CodeCache.node_parser(code)
+        test_code = cls.gen_test_code(code, testcase, np.key_input)
+        handle_code, results.changed_line_map = CodeCache.handle(test_code)
+        results.vari_names = np.var_name_list
+        results.line_vars_map = np.line_vars_map
+        # Instrumenting tracers compile their own code object
+        compiler = cls.tracer.compile if UnitTest == Tracing else Tracer.compile
+        results.test_code = CodeCache.compile(handle_code, compiler=compiler)
+        results.end_line = len(code.splitlines())
 
         # Unittest
-        rut = RunUnitTest()
+        rut = RunUnitTest(results)
         rut.run(UnitTest)
         
         # Only use in Tracing
         if UnitTest == Tracing:
-            cls.__fix_exec_traces(np, test_code)
-            cls.__fix_vari_values()
+            test_np = CodeCache.node_parser(test_code)
+            cls.__fix_exec_traces(results, np, 
+                                  test_np.object_line_node_dict, 
+                                  test_np.objectCall_line_dict)
                 
-        return Results.status, Results.stdout
+        return results
+    
+    @classmethod
+    def run_compiled(cls, program:Program, testcase, UnitTest=Running) -> Results:
+        # Batch mode: reuse the compiled program and only swap the precompiled testcase driver
+        np = program.node_parser
+        driver = None if np.key_input else testcase.driver
+        results = cls.new_results(testcase.input, testcase.output)
+        results.changed_line_map = program.changed_line_map
+        results.vari_names = np.var_name_list
+        results.line_vars_map = np.line_vars_map
+        results.test_code = program.code_obj
+        results.driver_code = driver.code_obj if driver else None
+        if UnitTest == Tracing:
+            results.test_code = program.traced_code(cls.tracer)
+            results.driver_code = driver.traced_code(cls.tracer) if driver else None
+        results.end_line = program.end_line
+
+        # Unittest
+        rut = RunUnitTest(results)
+        rut.run(UnitTest)
+
+        # Only use in Tracing
+        if UnitTest == Tracing:
+            objectCall_line_dict = driver.call_line_map(program) if driver \
+                else np.objectCall_line_dict
+            cls.__fix_exec_traces(results, np, 
+                                  np.object_line_node_dict, 
+                                  objectCall_line_dict)
+
+        return results
+    
+    @classmethod
+    def evaluate(cls, code:str, testcase, UnitTest=Running) -> Results:
+        start = time.perf_counter()
+        if cls.batch:
+            results = cls.run_compiled(cls.compile(code), testcase, UnitTest)
+        else:
+            results = cls.run(code, testcase, UnitTest)
+        results.elapsed = time.perf_counter() - start
+        # Traced runs are slower, only untraced runs order the testcases
+        if UnitTest == Running:
+            cls.testsuite.record(testcase.no, cls.is_pass(results.status), results.elapsed)
+        return results
+
+    @classmethod
+    def evaluate_all(cls, code:str, UnitTest=Running) -> dict[int, Results]:
+        # Testcases of a program run concurrently on the thread backend
+        testcases = list(cls.testsuite)
+        if cls.backend == 'thread':
+            results = cls.executor.map(lambda tc: cls.evaluate(code, tc, UnitTest), testcases)
+        else:
+            results = [cls.evaluate(code, tc, UnitTest) for tc in testcases]
+        return {tc.no: res for tc, res in zip(testcases, results)}
 
 
     @classmethod
     @cache
     def validation(cls, code:str) -> dict[int, str]:
+        if code in cls.test_hists:
+            return cls.test_hists[code]
+        if cls.disk_cache is None:
+            test_hist = cls.__validation(code)
+        else:
+            traced = cls.disk_cache.get(cls.disk_cache.key(code, 'trace'))
+            if traced is not None:
+                test_hist = traced[0]
+            else:
+                key = cls.disk_cache.key(code, 'validation')
+                test_hist = cls.disk_cache.get(key)
+                if test_hist is None:
+                    test_hist = cls.__validation(code)
+                    cls.disk_cache.put(key, test_hist)
+        cls.test_hists[code] = test_hist
+        return test_hist
+
+    @classmethod
+    def __validation(cls, code:str) -> dict[int, str]:
         test_hist = {}
 
-        for testcase in cls.testsuite:
-            cls.run(code, testcase.input, testcase.output)
-            test_hist[testcase.no] = Results.status
+        if cls.backend == 'pool':
+            results = cls.pool.run(code, cls.get_tc_no_list())
+            for tc_no, (status, _, _, _, elapsed) in results.items():
+                test_hist[tc_no] = status
+                cls.testsuite.record(tc_no, cls.is_pass(status), elapsed)
+        else:
+            for tc_no, results in cls.evaluate_all(code).items():
+                test_hist[tc_no] = results.status
         
         return test_hist
 
+    @classmethod
+    @cache
+    def is_solution(cls, code:str) -> bool:
+        # Untraced check which stops at the first failing testcase,
+        # outcomes already known for the program are used instead
+        if code in cls.test_hists:
+            return cls.is_all_pass(cls.test_hists[code])
+        if cls.disk_cache is not None:
+            for mode in ['trace', 'validation']:
+                cached = cls.disk_cache.get(cls.disk_cache.key(code, mode))
+                if cached is not None:
+                    test_hist = cached[0] if mode == 'trace' else cached
+                    cls.test_hists[code] = test_hist
+                    return cls.is_all_pass(test_hist)
+        for testcase in cls.testsuite.get_ordered_tcs():
+            results = cls.evaluate(code, testcase)
+            if not cls.is_pass(results.status):
+                return False
+        # Every testcase passed, which is the whole validation of the program
+        test_hist = {tc_no: UnitTestStatus.success for tc_no in cls.get_tc_no_list()}
+        cls.test_hists[code] = test_hist
+        if cls.disk_cache is not None:
+            cls.disk_cache.put(cls.disk_cache.key(code, 'validation'), test_hist)
+        return True
+
     @classmethod
     @cache
     def trace(cls, code:str) -> tuple[dict[int, str], dict[int, dict], dict[int, list]]:
+        if cls.disk_cache is None:
+            traced = cls.__trace(code)
+        else:
+            key = cls.disk_cache.key(code, 'trace')
+            traced = cls.disk_cache.get(key)
+            if traced is None:
+                traced = cls.__trace(code)
+                cls.disk_cache.put(key, traced)
+        cls.test_hists[code] = traced[0]
+        return traced
+
+    @classmethod
+    def __trace(cls, code:str) -> tuple[dict[int, str], dict[int, dict], dict[int, list]]:
         test_hist = {}
         vari_hist = {}
         trace_hist = {}
 
-        for testcase in cls.testsuite:
-            cls.run(code, testcase.input, testcase.output, Tracing)
-            test_hist[testcase.no] = Results.status
-            vari_hist[testcase.no] = Results.vari_traces
-            trace_hist[testcase.no] = Results.exec_traces
+        if cls.backend == 'pool':
+            results = cls.pool.run(code, cls.get_tc_no_list(), traced=True)
+            for tc_no, (status, _, vari_traces, exec_traces, _) in results.items():
+                test_hist[tc_no] = status
+                vari_hist[tc_no] = vari_traces
+                trace_hist[tc_no] = exec_traces
+        else:
+            for tc_no, results in cls.evaluate_all(code, Tracing).items():
+                test_hist[tc_no] = results.status
+                vari_hist[tc_no] = results.vari_traces
+                trace_hist[tc_no] = results.exec_traces
         
         return test_hist, vari_hist, trace_hist
     
@@ -1,3 +1,8 @@
+import os
+import json
+import threading
+
+
 class Testcases:
     def __init__(self, testcases:list):
         self.testcases = [self.Testcase(tc) for tc in sorted(testcases, key=lambda x: x['no'])]
@@ -8,12 +13,37 @@ class Testcases:
             self.input = testcase.get('input', None)
             self.output = testcase.get('output', None)
             self.open = testcase.get('open', True)
+            # Set by TestSuite.compile_drivers
+            self.key_input = False
+            self.driver_source = None
+            self.driver = None
 
 class TestSuite:
     def __init__(self, testcases:list):
         self.testcases = Testcases(testcases).testcases
         self.current_index = 0
-        
+        self.stats = {tc.no: self.new_stat() for tc in self.testcases}
+        self.saved_stats = {tc.no: self.new_stat() for tc in self.testcases}
+        self.lock = threading.Lock()
+        self.compile_drivers()
+
+    def compile_drivers(self):
+        # Driver of each testcase is made once, 
+        # an input which is not python code is a key input read from stdin
+        from ..utils import CodeCache
+        from .program import Driver
+        for testcase in self.testcases:
+            try:
+                source = testcase.input
+                if 'print(' not in source:
+                    source = 'print(' + source + ')'
+                CodeCache.regularize(testcase.input)
+                CodeCache.regularize(source)
+            except:
+                testcase.key_input = True
+                continue
+            testcase.driver_source = source
+            testcase.driver = Driver(CodeCache.regularize(source))
 
     def __iter__(self):
         self.current_index = 0
@@ -58,6 +88,53 @@ class TestSuite:
     def get_tc_no_list(self):
         return [tc.no for tc in self.testcases]
     
+    def new_stat(self) -> dict:
+        return {'runs': 0, 'fails': 0, 'time': 0.0}
+
+    def record(self, no, passed:bool, elapsed:float=0.0):
+        with self.lock:
+            stat = self.stats[no]
+            stat['runs'] += 1
+            stat['fails'] += 0 if passed else 1
+            stat['time'] += elapsed
+
+    def cost(self, no) -> float:
+        # Expected time to find a failure, the failure rate is smoothed for unseen testcases
+        stat = self.stats[no]
+        fail_rate = (stat['fails'] + 1) / (stat['runs'] + 2)
+        avg_time = stat['time'] / stat['runs'] if stat['runs'] else 0.0
+        return (avg_time + 1e-3) / fail_rate
+
+    def get_ordered_tcs(self):
+        # Most discriminating and cheapest testcases first, ties keep the testsuite order
+        return sorted(self.testcases, key=lambda tc: self.cost(tc.no))
+
+    def load_stats(self, path:str):
+        if not os.path.isfile(path):
+            return
+        with open(path, 'r') as f:
+            saved = json.load(f)
+        for no, stat in saved.items():
+            no = int(no)
+            if no in self.stats:
+                self.stats[no] = dict(stat)
+                self.saved_stats[no] = dict(stat)
+
+    def save_stats(self, path:str):
+        # Add only what this run counted, other runs may have saved meanwhile
+        saved = {}
+        if os.path.isfile(path):
+            with open(path, 'r') as f:
+                saved = json.load(f)
+        for no, stat in self.stats.items():
+            total = saved.setdefault(str(no), self.new_stat())
+            for k in total.keys():
+                total[k] += stat[k] - self.saved_stats[no][k]
+            self.saved_stats[no] = dict(total)
+            self.stats[no] = dict(total)
+        with open(path, 'w') as f:
+            json.dump(saved, f, indent=4)
+    
     def get_tc_by_no(self, no):
         for testcase in self.testcases:
             if testcase.no == no:
@@ -0,0 +1,52 @@
+import os
+import zlib
+import pickle
+import sqlite3
+import hashlib
+
+
+class TraceCache:
+    # Content-addressed store of test/trace results shared across trials, processes and runs
+    def __init__(self, cache_dir:str, testsuite, timeout:int=1, version:str='1'):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'traces.db')
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS traces (key TEXT PRIMARY KEY, data BLOB)')
+        self.suite_hash = self.__testsuite_hash(testsuite)
+        self.timeout = timeout
+        self.version = version
+
+    def __testsuite_hash(self, testsuite) -> str:
+        testcases = [(tc.no, tc.input, tc.output) for tc in testsuite.testcases]
+        return hashlib.sha256(repr(testcases).encode('utf-8')).hexdigest()
+
+    def __code_hash(self, code:str) -> str:
+        from ..utils import CodeCache
+        return hashlib.sha256(CodeCache.regularize(code).encode('utf-8')).hexdigest()
+
+    def key(self, code:str, mode:str) -> str:
+        code_hash = self.__code_hash(code)
+        return f'{mode}:{code_hash}:{self.suite_hash}:{self.timeout}:{self.version}'
+
+    def pair_key(self, code1:str, code2:str, mode:str) -> str:
+        code_hash = f'{self.__code_hash(code1)}:{self.__code_hash(code2)}'
+        return f'{mode}:{code_hash}:{self.suite_hash}:{self.timeout}:{self.version}'
+
+    def get(self, key:str):
+        row = self.conn.execute('SELECT data FROM traces WHERE key = ?', 
+                                (key,)).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def put(self, key:str, value):
+        try: data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            # Values of some variables can not be serialized
+            return
+        self.conn.execute('INSERT OR REPLACE INTO traces (key, data) VALUES (?, ?)',
+                          (key, data))
+
+    def close(self):
+        self.conn.close()
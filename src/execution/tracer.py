@@ -1,17 +1,32 @@
+import os
 import sys
 import trace
+import types
 import threading
-from ordered_set import OrderedSet
 
 from .results import Results
+from .program import DRIVER
+
+from ..utils import BoundedRepr, Truncated, Snapshot
+
+from ..transform import TraceInstrumenter
+from ..transform.traceInstrumenter import LINE_FUNC, ITER_FUNC, COMP_FUNC, EXCEPT_FUNC, \
+    RAISE_FUNC, ERROR_FUNC, EXIT_FUNC, RETURN_FUNC, TRACE_FLAG
 
 class Tracer(trace.Trace):
-    def __init__(self, count=1, 
+    version = '4'
+    instrument = False
+
+    def __init__(self, results:Results=None,
+                 count=1, 
                  trace=0, 
                  countfuncs=0, 
                  countcallers=0,
                  ignoremods=(), 
-                 ignoredirs=[sys.prefix, sys.exec_prefix], 
+                 # The tester itself (e.g. stream proxies) is never traced,
+                 # nor the standard library of a virtual environment
+                 ignoredirs=[sys.prefix, sys.exec_prefix, sys.base_prefix, 
+                             sys.base_exec_prefix, os.path.dirname(__file__)], 
                  infile=None, 
                  outfile=None,
                  timing=False):
@@ -20,22 +35,57 @@ class Tracer(trace.Trace):
                         ignoremods, ignoredirs, 
                         infile, outfile,
                         timing)
+        self.results = results if results is not None else Results()
         self.b_line = 1
-        self.max_depth = 100
+        self.max_depth = self.results.trace_limit
+        self.value_repr = BoundedRepr(self.results.repr_limit)
+        self.cut_vars = set()
+        self.recorded = set()
     
     def variable_trace(self, var_dict:dict):
         for k, v in var_dict.items():
-            if self.b_line in Results.line_vars_map.keys() and \
-                k in Results.line_vars_map[self.b_line]:
-                Results.vari_traces.setdefault(k, OrderedSet())
-                Results.vari_traces[k].add((str(v), self.b_line))
+            if self.b_line in self.results.line_vars_map.keys() and \
+                k in self.results.line_vars_map[self.b_line]:
+                self.results.vari_traces.setdefault(k, [])
+                if k in self.cut_vars: continue
+                if len(self.results.vari_traces[k]) >= self.results.value_limit:
+                    # Later values of the variable are not recorded
+                    self.results.vari_traces[k].append((Truncated(cut=True), self.b_line))
+                    self.cut_vars.add(k)
+                    continue
+                # Each (value, line) of a variable is recorded once
+                text = self.value_repr.run(v)
+                if (k, str(text), self.b_line) in self.recorded: continue
+                self.recorded.add((k, str(text), self.b_line))
+                self.results.vari_traces[k].append((Snapshot.take(v, text), self.b_line))
+    
+    def truncate(self):
+        # Traces are full, the rest of the run is not recorded
+        self.results.exec_traces.truncated = True
     
     def execution_trace(self, lineno:int):
-        Results.exec_traces.append(lineno)
+        self.results.exec_traces.append(lineno)
+    
+    def line_trace(self, frame, filename:str, lineno:int):
+        if filename == DRIVER:
+            # Driver lines are numbered after the program
+            origin_lineno = self.results.end_line + lineno
+            self.execution_trace(origin_lineno)
+            self.variable_trace(frame.f_locals)
+            self.b_line = origin_lineno
+        elif lineno in self.results.changed_line_map.keys():
+            origin_lineno = self.results.changed_line_map[lineno]
+            # append line numbers to traces list
+            self.execution_trace(origin_lineno)
+            # append variable values
+            # print(len(frame.f_locals))
+            self.variable_trace(frame.f_locals)
+            self.b_line = origin_lineno
     
     def localtrace_count(self, frame, why, arg):
         self.max_depth -= 1
         if self.max_depth < 0:
+            self.truncate()
             return self.localtrace
         if why == "line":
             # record the file name and line number of every trace
@@ -43,26 +93,323 @@ class Tracer(trace.Trace):
             lineno = frame.f_lineno
             key = filename, lineno
             self.counts[key] = self.counts.get(key, 0) + 1
-            if lineno in Results.changed_line_map.keys():
-                origin_lineno = Results.changed_line_map[lineno]
-                # append line numbers to traces list
-                self.execution_trace(origin_lineno)
-                # append variable values
-                # print(len(frame.f_locals))
-                self.variable_trace(frame.f_locals)
-                self.b_line = origin_lineno
+            self.line_trace(frame, filename, lineno)
         return self.localtrace
     
+    @classmethod
+    def compile(cls, source:str, filename:str='<string>'):
+        return compile(source, filename, 'exec')
+    
     def runctx(self, cmd, globals=None, locals=None):
         # Do not delete runctx
         if globals is None: globals = {}
         if locals is None: locals = {}
+        # Only the thread of this run is traced
         if not self.donothing:
-            threading.settrace(self.globaltrace)
             sys.settrace(self.globaltrace)
         try:
             exec(cmd, globals)
         finally:
             if not self.donothing:
                 sys.settrace(None)
-                threading.settrace(None)
+
+
+
+class MonitoringTracer(Tracer):
+    # Line tracer on sys.monitoring (PEP 669) which only instruments the program's code objects.
+    # Events are counted like the legacy settrace events (line, return, exception)
+    # so that max_depth cuts traces at the same place as Tracer.
+    version = '4-monitoring'
+    tool_id = None
+    tracers = {}
+    code_users = {}
+    # Line of each offset of the codes in use
+    line_tables = {}
+    # Since python 3.13 the first instruction after RESUME has no LINE event
+    # when it is on the line of RESUME (e.g. lambdas, generator expressions
+    # and class bodies), settrace still reports that line on entry
+    entry_lines = sys.version_info >= (3, 13)
+    lock = threading.Lock()
+
+    def __init__(self, results:Results=None):
+        super().__init__(results)
+        self.codes = set()
+        # Frame and first offset of the last entry line
+        self.entry = None
+
+    @classmethod
+    def init_tool(cls):
+        if cls.tool_id is not None:
+            return
+        monitoring = sys.monitoring
+        events = monitoring.events
+        for tool_id in range(6):
+            if monitoring.get_tool(tool_id) is None:
+                break
+        else:
+            raise RuntimeError("No free sys.monitoring tool id")
+        monitoring.use_tool_id(tool_id, 'mentored')
+        monitoring.register_callback(tool_id, events.LINE, cls.__on_line)
+        monitoring.register_callback(tool_id, events.PY_START, cls.__on_start)
+        monitoring.register_callback(tool_id, events.JUMP, cls.__on_jump)
+        monitoring.register_callback(tool_id, events.PY_RETURN, cls.__on_event)
+        monitoring.register_callback(tool_id, events.PY_YIELD, cls.__on_event)
+        monitoring.register_callback(tool_id, events.PY_UNWIND, cls.__on_event)
+        monitoring.register_callback(tool_id, events.RAISE, cls.__on_event)
+        monitoring.register_callback(tool_id, events.STOP_ITERATION, cls.__on_event)
+        cls.tool_id = tool_id
+
+    @classmethod
+    def __get_tracer(cls, code):
+        tracer = cls.tracers.get(threading.get_ident())
+        if tracer is None or code not in tracer.codes:
+            return None
+        return tracer
+
+    @classmethod
+    def __on_line(cls, code, lineno):
+        tracer = cls.__get_tracer(code)
+        if tracer is None:
+            return
+        frame = sys._getframe(1)
+        if tracer.entry is not None:
+            entry, tracer.entry = tracer.entry, None
+            if entry == (frame, frame.f_lasti):
+                return
+        if tracer.count_event():
+            tracer.line_trace(frame, code.co_filename, lineno)
+
+    @classmethod
+    def __on_start(cls, code, offset):
+        # Entry line of a frame on the line of RESUME, which only depends on
+        # the code, so codes whose first instruction has its own line are disabled
+        lineno = cls.get_line(code, offset)
+        if lineno is None or lineno != cls.get_line(code, offset + 2):
+            return sys.monitoring.DISABLE
+        tracer = cls.__get_tracer(code)
+        if tracer is not None and tracer.count_event():
+            frame = sys._getframe(1)
+            # A LINE event may still follow on the first instruction, it is skipped
+            tracer.entry = frame, offset + 2
+            tracer.line_trace(frame, code.co_filename, lineno)
+
+    @classmethod
+    def __on_jump(cls, code, from_offset, to_offset):
+        # Backward jumps to the same line are line events for settrace.
+        # Other jumps never are, which only depends on the instruction,
+        # so they are disabled for every later run of the code
+        if to_offset > from_offset:
+            return sys.monitoring.DISABLE
+        to_line = cls.get_line(code, to_offset)
+        if to_line is None or to_line != cls.get_line(code, from_offset):
+            return sys.monitoring.DISABLE
+        tracer = cls.__get_tracer(code)
+        if tracer is None:
+            return
+        if tracer.count_event():
+            tracer.line_trace(sys._getframe(1), code.co_filename, to_line)
+
+    @classmethod
+    def __on_event(cls, code, offset, arg):
+        tracer = cls.__get_tracer(code)
+        if tracer is not None:
+            tracer.count_event()
+
+    def count_event(self) -> bool:
+        self.max_depth -= 1
+        if self.max_depth < 0:
+            # Traces are full, stop every event of this run
+            self.truncate()
+            self.stop()
+            return False
+        return True
+
+    @classmethod
+    def get_line(cls, code, offset:int) -> int:
+        with cls.lock:
+            if code not in cls.line_tables:
+                cls.line_tables[code] = {off: line 
+                                         for start, end, line in code.co_lines() 
+                                         for off in range(start, end, 2)}
+            return cls.line_tables[code].get(offset)
+
+    def __collect_codes(self, code):
+        self.codes.add(code)
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                self.__collect_codes(const)
+
+    def start(self, code):
+        cls = MonitoringTracer
+        cls.init_tool()
+        events = sys.monitoring.events
+        local_events = events.LINE | events.JUMP | events.PY_RETURN \
+            | events.PY_YIELD | events.STOP_ITERATION
+        if cls.entry_lines:
+            local_events |= events.PY_START
+        self.__collect_codes(code)
+        with cls.lock:
+            cls.tracers[threading.get_ident()] = self
+            for code in self.codes:
+                cls.code_users[code] = cls.code_users.get(code, 0) + 1
+                sys.monitoring.set_local_events(cls.tool_id, code, local_events)
+            sys.monitoring.set_events(cls.tool_id, events.RAISE | events.PY_UNWIND)
+
+    def stop(self):
+        cls = MonitoringTracer
+        with cls.lock:
+            if cls.tracers.get(threading.get_ident()) is not self:
+                return
+            del cls.tracers[threading.get_ident()]
+            for code in self.codes:
+                # Other runs may share the compiled program
+                cls.code_users[code] -= 1
+                if cls.code_users[code] == 0:
+                    del cls.code_users[code]
+                    cls.line_tables.pop(code, None)
+                    sys.monitoring.set_local_events(cls.tool_id, code, 0)
+            if not cls.tracers:
+                sys.monitoring.set_events(cls.tool_id, 0)
+
+    def runctx(self, cmd, globals=None, locals=None):
+        if globals is None: globals = {}
+        code = cmd if isinstance(cmd, types.CodeType) else compile(cmd, '<string>', 'exec')
+        self.start(code)
+        try:
+            exec(code, globals)
+        finally:
+            self.stop()
+
+
+
+class InstrumentTracer(Tracer):
+    # Tracer without interpreter hooks, the program itself calls the recorders
+    # which are inserted by TraceInstrumenter where settrace has its events.
+    # Events are counted like Tracer (line, return, exception) so that
+    # max_depth cuts traces at the same place, and values are read from
+    # the frame of each line event like Tracer.line_trace does.
+    # Known differences from Tracer:
+    # - a lambda left by an exception counts neither the exception nor its return
+    # - values passed through 'yield from' are not counted as returns
+    # - an exception re-raised with a bare 'raise' after the frame caught
+    #   another one is counted again
+    # - before python 3.12, the return of a comprehension left by an exception
+    #   is counted when its frame is released, not when it is left
+    # - since python 3.13, a generator function closed at a yield outside
+    #   of any try counts the exception and its return, settrace has none
+    # - decorators, match cases and async loops have no events of their own
+    version = '5-instrument'
+    instrument = True
+    closed_events = sys.version_info < (3, 13)
+
+    def __init__(self, results:Results=None):
+        super().__init__(results)
+        # Last counted exception of each running frame
+        self.raised = {}
+
+    @classmethod
+    def compile(cls, source:str, filename:str='<string>'):
+        tree = TraceInstrumenter(driver=filename == DRIVER).run(source)
+        return compile(tree, filename, 'exec')
+
+    def count_event(self) -> bool:
+        self.max_depth -= 1
+        if self.max_depth < 0:
+            # Traces are full, turn off every recorder of the program
+            self.truncate()
+            self.globals[TRACE_FLAG] = False
+            return False
+        return True
+
+    def line_event(self, frame, lineno:int, driver:bool):
+        if self.count_event():
+            self.line_trace(frame, DRIVER if driver else frame.f_code.co_filename, lineno)
+
+    def record_line(self, lineno:int, driver:bool=False) -> bool:
+        self.line_event(sys._getframe(1), lineno, driver)
+        return True
+
+    def record_iter(self, lineno:int, driver:bool, iterable, depth:int=1):
+        # Loop checks its line before every next item except the first one
+        iterator = iter(iterable)
+        for item in iterator:
+            yield item
+            if not self.globals[TRACE_FLAG]:
+                break
+            self.line_event(sys._getframe(depth), lineno, driver)
+        yield from iterator
+
+    def record_comp(self, lineno:int, driver:bool, own_frame:bool, iterable):
+        if not own_frame:
+            # Inlined into the frame which loops over this generator
+            yield from self.record_iter(lineno, driver, iterable, depth=2)
+            return
+        # The frame of comprehension checks its line before every item, 
+        # and returns when it is exhausted or closed
+        try:
+            iterator = iter(iterable)
+            while self.globals[TRACE_FLAG]:
+                self.line_event(sys._getframe(1), lineno, driver)
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    if self.globals[TRACE_FLAG]:
+                        self.count_event()
+                    return
+                yield item
+            yield from iterator
+        except GeneratorExit:
+            # Since python 3.13 a frame closed at its yield is not resumed,
+            # before it counts the exception and its return
+            if self.globals[TRACE_FLAG] and self.closed_events and self.count_event():
+                self.count_event()
+            raise
+
+    def record_except(self, lineno:int, driver:bool, types):
+        # Tested except clause, the exception is counted once by its frame
+        if self.globals[TRACE_FLAG]:
+            frame = sys._getframe(1)
+            self.count_error(frame)
+            if self.globals[TRACE_FLAG]:
+                self.line_event(frame, lineno, driver)
+        return types
+
+    def count_error(self, frame):
+        error = sys.exc_info()[1]
+        if self.raised.get(frame) is error:
+            return
+        self.raised[frame] = error
+        self.count_event()
+
+    def record_raise(self):
+        self.raised.pop(sys._getframe(1), None)
+
+    def record_error(self):
+        self.count_error(sys._getframe(1))
+
+    def record_exit(self):
+        self.raised.pop(sys._getframe(1), None)
+        self.count_event()
+
+    def record_return(self, value):
+        if self.globals[TRACE_FLAG]:
+            self.count_event()
+        return value
+
+    def runctx(self, cmd, globals=None, locals=None):
+        if globals is None: globals = {}
+        code = self.compile(cmd) if isinstance(cmd, str) else cmd
+        self.globals = globals
+        globals[TRACE_FLAG] = self.max_depth >= 0
+        globals[LINE_FUNC] = self.record_line
+        globals[ITER_FUNC] = self.record_iter
+        globals[COMP_FUNC] = self.record_comp
+        globals[EXCEPT_FUNC] = self.record_except
+        globals[RAISE_FUNC] = self.record_raise
+        globals[ERROR_FUNC] = self.record_error
+        globals[EXIT_FUNC] = self.record_exit
+        globals[RETURN_FUNC] = self.record_return
+        try:
+            exec(code, globals)
+        finally:
+            self.raised.clear()
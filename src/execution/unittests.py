@@ -1,11 +1,52 @@
 import unittest
 from io import StringIO
-from unittest.mock import patch, mock_open
-from timeout_decorator import timeout
+import ctypes
+import threading
+from functools import wraps
+from unittest.mock import MagicMock, mock_open
+from timeout_decorator import timeout, TimeoutError
 # from timeout_function_decorator import timeout
 
 from .results import Results
 from .tracer import Tracer
+from .sandbox import Sandbox
+from .streams import Streams
+
+
+def thread_timeout(seconds:float):
+    # Signals only reach the main thread, other threads are stopped by a watchdog
+    # which raises TimeoutError asynchronously at the next bytecode of the run.
+    # A blocking C call (e.g. time.sleep) is not interrupted, the run times out
+    # when the call returns, so there is no wall-clock guarantee
+    def decorate(function):
+        @wraps(function)
+        def new_function(*args, **kwargs):
+            ident = threading.get_ident()
+            lock = threading.Lock()
+            running = [True]
+            def expire():
+                with lock:
+                    if running[0]:
+                        ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                            ctypes.c_ulong(ident), ctypes.py_object(TimeoutError))
+            watchdog = threading.Timer(seconds, expire)
+            watchdog.daemon = True
+            watchdog.start()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with lock:
+                    running[0] = False
+                watchdog.cancel()
+        return new_function
+    return decorate
+
+
+def run_timeout(seconds:float):
+    if threading.current_thread() is threading.main_thread():
+        return timeout(seconds)
+    return thread_timeout(seconds)
+
 
 class UnitTestStatus:
     success = 'Success'
@@ -30,15 +71,18 @@ class TextTestResult(unittest.TextTestResult):
 
 class Running(unittest.TestCase):
     def setUp(self):
-        self.original_globals = dict(globals()).copy()
-        globals()['__name__'] = '__main__'
-        self.input_data = StringIO(Results.input)
+        self.input_data = StringIO(self.results.input)
         self.mock_stdout = StringIO()
         self.mock_stderr = StringIO()
+        # Every run has its own globals, builtins are shadowed instead of patched
+        self.results.globals = {
+            '__name__': '__main__',
+            '__file__': '<program>',
+            'input': MagicMock(side_effect=self.input_data),
+            'open': mock_open(read_data=self.results.input)}
     
     def tearDown(self) -> None:
-        globals().clear()
-        globals().update(self.original_globals)
+        self.results.globals = None
         self.input_data.close()
         self.mock_stdout.close()
         self.mock_stderr.close()
@@ -48,34 +92,39 @@ class Running(unittest.TestCase):
         except AssertionError as e:
             raise AssertionError(actual)
 
-    @timeout(Results.timeout)
     def test(self):
-        with (
-            patch('sys.stdin', self.input_data),
-            patch('builtins.open', mock_open(read_data=Results.input)),
-            patch('builtins.input', side_effect=self.input_data),
-            patch('sys.stdout', self.mock_stdout),
-            patch('sys.stderr', self.mock_stderr)):
-            try:
-                exec(Results.test_code, globals())
-                output = self.mock_stdout.getvalue().strip()
-                self.assertEqual(output, Results.output)
-            except Exception as e:
-                output = str(e)
-                self.fail(output)
+        # Timeout is decided per run, not at import
+        run_timeout(self.results.timeout)(self.run_test)()
+
+    def run_test(self):
+        Streams.redirect(self.input_data, self.mock_stdout, self.mock_stderr)
+        try:
+            exec(self.results.test_code, self.results.globals)
+            if self.results.driver_code is not None:
+                exec(self.results.driver_code, self.results.globals)
+            output = self.mock_stdout.getvalue().strip()
+            self.assertEqual(output, self.results.output)
+        except Exception as e:
+            output = str(e)
+            self.fail(output)
+        finally:
+            Streams.restore()
         
 
 class Tracing(unittest.TestCase):
     def setUp(self):
-        self.original_globals = dict(globals()).copy()
-        globals()['__name__'] = '__main__'
-        self.input_data = StringIO(Results.input)
+        self.input_data = StringIO(self.results.input)
         self.mock_stdout = StringIO()
         self.mock_stderr = StringIO()
+        # Every run has its own globals, builtins are shadowed instead of patched
+        self.results.globals = {
+            '__name__': '__main__',
+            '__file__': '<program>',
+            'input': MagicMock(side_effect=self.input_data),
+            'open': mock_open(read_data=self.results.input)}
     
     def tearDown(self) -> None:
-        globals().clear()
-        globals().update(self.original_globals)
+        self.results.globals = None
         self.input_data.close()
         self.mock_stdout.close()
         self.mock_stderr.close()
@@ -85,29 +134,57 @@ class Tracing(unittest.TestCase):
         except AssertionError as e:
             raise AssertionError(actual)
 
-    @timeout(Results.timeout)
     def test(self):
-        with (
-            patch('sys.stdin', self.input_data),
-            patch('builtins.open', mock_open(read_data=Results.input)),
-            patch('builtins.input', side_effect=self.input_data),
-            patch('sys.stdout', self.mock_stdout),
-            patch('sys.stderr', self.mock_stderr)):
-            try:
-                Tracer().runctx(Results.test_code, globals())
-                output = self.mock_stdout.getvalue().strip()
-                self.assertEqual(output, Results.output)
-            except Exception as e:
-                output = str(e)
-                self.fail(output)
+        # Timeout is decided per run, not at import
+        run_timeout(self.results.timeout)(self.run_test)()
+
+    def run_test(self):
+        Streams.redirect(self.input_data, self.mock_stdout, self.mock_stderr)
+        try:
+            tracer = (self.results.tracer or Tracer)(self.results)
+            tracer.runctx(self.results.test_code, self.results.globals)
+            if self.results.driver_code is not None:
+                # Not count the return event of the separately executed program
+                tracer.max_depth += 1
+                tracer.runctx(self.results.driver_code, self.results.globals)
+            output = self.mock_stdout.getvalue().strip()
+            self.assertEqual(output, self.results.output)
+        except Exception as e:
+            output = str(e)
+            self.fail(output)
+        finally:
+            Streams.restore()
                 
 
 class RunUnitTest:
-    def run(cls, UnitTest=Running):
-        suite = unittest.TestLoader().loadTestsFromTestCase(UnitTest)
+    def __init__(self, results:Results):
+        self.results = results
+
+    def run(self, UnitTest=Running):
+        if self.results.isolation == 'fork':
+            self.run_forked(UnitTest)
+        else:
+            self.run_unittest(UnitTest)
+
+    def run_forked(self, UnitTest=Running):
+        def child():
+            self.run_unittest(UnitTest)
+            return self.results.status, self.results.exec_traces, self.results.vari_traces
+        sandbox = Sandbox(self.results.timeout, self.results.memory_limit)
+        result = sandbox.run(child)
+        if result is None:
+            # Killed by the limits of sandbox
+            self.results.status = UnitTestStatus.failure
+        else:
+            self.results.status, self.results.exec_traces, self.results.vari_traces = result
+
+    def run_unittest(self, UnitTest=Running):
+        test = UnitTest('test')
+        test.results = self.results
+        suite = unittest.TestSuite([test])
         stream = StringIO()
         runner = unittest.TextTestRunner(stream=stream)
         runner.resultclass = TextTestResult
         res = runner.run(suite)
-        Results.status = res.status
+        self.results.status = res.status
         stream.close()
@@ -0,0 +1,49 @@
+import os
+from multiprocess import Pool
+
+from .unittests import Running, Tracing
+
+
+def _init_worker(testcases:list, timeout:int, batch:bool, tracer:str,
+                 isolation:str, memory_limit:int, 
+                 trace_limit:int, value_limit:int, repr_limit:int):
+    # Every worker keeps its own serial Tester for the whole pool lifetime
+    from .tester import Tester
+    Tester.init_global_data(testcases, timeout, batch=batch, tracer=tracer,
+                            isolation=isolation, memory_limit=memory_limit,
+                            trace_limit=trace_limit, value_limit=value_limit, 
+                            repr_limit=repr_limit)
+
+
+def _run_job(job:tuple) -> tuple:
+    from .tester import Tester
+    code, tc_no, traced = job
+    testcase = Tester.testsuite.get_tc_by_no(tc_no)
+    UnitTest = Tracing if traced else Running
+    results = Tester.evaluate(code, testcase, UnitTest)
+    if traced:
+        return results.status, results.stdout, results.vari_traces, results.exec_traces, results.elapsed
+    return results.status, results.stdout, None, None, results.elapsed
+
+
+class WorkerPool:
+    def __init__(self, testcases:list, timeout:int=1, workers:int=None, 
+                 batch:bool=False, tracer:str='settrace', 
+                 isolation:str='signal', memory_limit:int=None,
+                 trace_limit:int=100, value_limit:int=1000, repr_limit:int=1000):
+        self.workers = workers if workers else os.cpu_count()
+        self.pool = Pool(self.workers,
+                         initializer=_init_worker,
+                         initargs=(testcases, timeout, batch, tracer,
+                                   isolation, memory_limit,
+                                   trace_limit, value_limit, repr_limit))
+
+    def run(self, code:str, tc_no_list:list, traced:bool=False) -> dict[int, tuple]:
+        # One (code, testcase) job per testcase, results keep the testsuite order
+        jobs = [(code, tc_no, traced) for tc_no in tc_no_list]
+        results = self.pool.map(_run_job, jobs)
+        return dict(zip(tc_no_list, results))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
@@ -1,4 +1,6 @@
-from .fitness import Fitness
+from .fitness import Fitness, Profile
+from .fitnessCache import FitnessCache
+from .fitnessMatrix import FitnessMatrix
 from .selection import Selection
 from .variation import Variation
 from .fixHistory import FixHistory
\ No newline at end of file
@@ -1,35 +1,41 @@
-from functools import cache
-
-from ..transform import NodeMap
-from ..utils import divide
+from ..utils import divide, CodeCache, LCS
 from ..execution import Tester
+from .fitnessCache import FitnessCache
 
 class Fitness:
     @staticmethod
-    @cache
     def run(w_code:str, r_code:str) -> dict:
-        w_code = w_code
-        w_test_hist, _, w_trace_hist = Tester.trace(w_code)
-        w_pass, w_fail = Tester.split_test_hist(w_test_hist)
-        
-        r_test_hist, _, r_trace_hist = Tester.trace(r_code)
-        r_pass, r_fail = Tester.split_test_hist(r_test_hist)
+        score = FitnessCache.get(w_code, r_code)
+        if score is None:
+            score = Fitness.compute(w_code, r_code)
+            FitnessCache.put(w_code, r_code, score)
+        return score
+
+    @staticmethod
+    def profile(code:str) -> 'Profile':
+        profile = FitnessCache.get_profile(code)
+        if profile is None:
+            profile = Profile(code)
+            FitnessCache.put_profile(code, profile)
+        return profile
+
+    @staticmethod
+    def compute(w_code:str, r_code:str) -> dict:
+        w_profile = Fitness.profile(w_code)
+        r_profile = Fitness.profile(r_code)
         
         # Unit Test Score
-        fp = set(w_fail) & set(r_pass)
-        pp = set(w_pass) & set(r_pass)
-        fp_test = divide(len(fp), len(w_fail))
-        pp_test = divide(len(pp), len(w_pass))
+        fp = w_profile.failed & r_profile.passed
+        pp = w_profile.passed & r_profile.passed
+        fp_test = divide(len(fp), len(w_profile.failed))
+        pp_test = divide(len(pp), len(w_profile.passed))
         
         # Execution Trace Score
         fp_trace, pp_trace = 0, 0
-        nodeMap = NodeMap(w_code, r_code)
         for testcase in Tester.testsuite:
             if testcase.no not in fp and testcase.no not in pp:
                 continue
-            trace_sim = nodeMap.trace_sim(
-                w_trace_hist[testcase.no], 
-                r_trace_hist[testcase.no])
+            trace_sim = w_profile.trace_sim(r_profile, testcase.no)
             if testcase.no in fp: fp_trace += trace_sim
             elif testcase.no in pp: pp_trace += trace_sim
         fp_trace = divide(fp_trace, len(fp))
@@ -39,4 +45,28 @@ class Fitness:
         score = {'fp_test': fp_test, 'pp_test': pp_test, 
                  'fp_trace': fp_trace, 'pp_trace': pp_trace}
         return score
-    
\ No newline at end of file
+
+
+class Profile:
+    # Half of the fitness which only depends on one program, 
+    # test outcomes and node names of the traces per testcase
+    def __init__(self, code:str):
+        test_hist, _, trace_hist = Tester.trace(code)
+        passed, failed = Tester.split_test_hist(test_hist)
+        self.passed, self.failed = set(passed), set(failed)
+        tree = CodeCache.flat_tree(code)
+        line_nodes = tree.line_nodes()
+        self.trace_lens = {}
+        self.trace_names = {}
+        for tc_no, traces in trace_hist.items():
+            # Node names of distinct traced nodes like NodeMap's trace node map
+            self.trace_names[tc_no] = [tree.name(line_nodes[lineno]) 
+                                       for lineno in traces.first_seen()
+                                       if lineno in line_nodes]
+            self.trace_lens[tc_no] = len(traces)
+
+    def trace_sim(self, other:'Profile', tc_no:int) -> float:
+        # Same as NodeMap.trace_sim, the mapped nodes of rep_node_map are the LCS of node names
+        lcs = LCS.length(self.trace_names[tc_no], other.trace_names[tc_no])
+        return divide(lcs, max(self.trace_lens[tc_no], other.trace_lens[tc_no]))
+
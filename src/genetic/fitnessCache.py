@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from ..execution import Tester
+
+
+class FitnessCache:
+    # Bounded LRU of fitness scores keyed by the hash of the program pair,
+    # shared across processes through the disk cache of Tester when it is set
+    max_size = 65536
+    scores = OrderedDict()
+    profiles = OrderedDict()
+    hits = 0
+    disk_hits = 0
+    misses = 0
+    evictions = 0
+    lock = threading.Lock()
+
+    @classmethod
+    def init_global_data(cls, max_size:int=None):
+        if max_size is not None:
+            cls.max_size = max_size
+        cls.clear()
+
+    @classmethod
+    def clear(cls):
+        # Scores depend on the testsuite and traces of a trial
+        with cls.lock:
+            cls.scores = OrderedDict()
+            cls.profiles = OrderedDict()
+            cls.hits = 0
+            cls.disk_hits = 0
+            cls.misses = 0
+            cls.evictions = 0
+
+    @classmethod
+    def key(cls, w_code:str, r_code:str) -> bytes:
+        return hashlib.blake2b(f'{w_code}\0{r_code}'.encode('utf-8'), digest_size=16).digest()
+
+    @classmethod
+    def __disk_key(cls, w_code:str, r_code:str) -> str:
+        return Tester.disk_cache.pair_key(w_code, r_code, 'fitness')
+
+    @classmethod
+    def contains(cls, w_code:str, r_code:str) -> bool:
+        return cls.key(w_code, r_code) in cls.scores
+
+    @classmethod
+    def get(cls, w_code:str, r_code:str) -> dict:
+        key = cls.key(w_code, r_code)
+        with cls.lock:
+            if key in cls.scores:
+                cls.scores.move_to_end(key)
+                cls.hits += 1
+                return dict(cls.scores[key])
+        if Tester.disk_cache is not None:
+            score = Tester.disk_cache.get(cls.__disk_key(w_code, r_code))
+            if score is not None:
+                with cls.lock:
+                    cls.disk_hits += 1
+                cls.put(w_code, r_code, score, disk=False)
+                return dict(score)
+        with cls.lock:
+            cls.misses += 1
+        return None
+
+    @classmethod
+    def put(cls, w_code:str, r_code:str, score:dict, disk:bool=True):
+        key = cls.key(w_code, r_code)
+        with cls.lock:
+            cls.scores[key] = dict(score)
+            cls.scores.move_to_end(key)
+            while len(cls.scores) > cls.max_size:
+                cls.scores.popitem(last=False)
+                cls.evictions += 1
+        if disk and Tester.disk_cache is not None:
+            Tester.disk_cache.put(cls.__disk_key(w_code, r_code), dict(score))
+
+    @classmethod
+    def get_profile(cls, code:str):
+        key = hashlib.blake2b(code.encode('utf-8'), digest_size=16).digest()
+        with cls.lock:
+            if key in cls.profiles:
+                cls.profiles.move_to_end(key)
+                return cls.profiles[key]
+        return None
+
+    @classmethod
+    def put_profile(cls, code:str, profile):
+        # Profiles of programs are far fewer than pairs, at least one is kept
+        key = hashlib.blake2b(code.encode('utf-8'), digest_size=16).digest()
+        with cls.lock:
+            cls.profiles[key] = profile
+            while len(cls.profiles) > max(1, cls.max_size // 16):
+                cls.profiles.popitem(last=False)
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls.lock:
+            total = cls.hits + cls.disk_hits + cls.misses
+            return {'size': len(cls.scores), 'max_size': cls.max_size,
+                    'profiles': len(cls.profiles),
+                    'hits': cls.hits, 'disk_hits': cls.disk_hits, 
+                    'misses': cls.misses, 'evictions': cls.evictions,
+                    'hit_rate': round((cls.hits + cls.disk_hits) / total, 4) if total else 0}
@@ -0,0 +1,85 @@
+import numpy as np
+from tqdm import tqdm
+from multiprocess import Pool
+
+from .fitness import Fitness
+from .fitnessCache import FitnessCache
+from ..execution import Tester
+
+
+def _init_worker(global_data:dict):
+    # Every worker traces with its own serial Tester,
+    # handles inherited from the parent are dropped without closing them
+    Tester.pool = None
+    Tester.executor = None
+    Tester.disk_cache = None
+    Tester.init_global_data(**global_data)
+
+
+def _run_job(pair:tuple) -> dict:
+    w_code, r_code = pair
+    return Fitness.run(w_code, r_code)
+
+
+class FitnessMatrix:
+    # Fitness scores of every (wrong, sample) pair, missing pairs are computed in parallel
+    workers = None
+    pool = None
+
+    @classmethod
+    def init_global_data(cls, workers:int=None):
+        cls.shutdown()
+        cls.workers = workers
+        if workers is not None and workers > 1:
+            cls.pool = Pool(workers, initializer=_init_worker, 
+                            initargs=(Tester.global_data, ))
+
+    @classmethod
+    def shutdown(cls):
+        if cls.pool is not None:
+            cls.pool.close()
+            cls.pool.join()
+            cls.pool = None
+
+    @classmethod
+    def __compute(cls, pairs:list) -> dict:
+        if cls.pool is None:
+            scores = {}
+            for pair in tqdm(pairs, desc="Fitness", leave=False):
+                scores[pair] = Fitness.compute(*pair)
+                FitnessCache.put(*pair, scores[pair])
+            return scores
+        # Pairs of the same wrong stay together so a worker traces the wrong once
+        chunksize = max(1, len(pairs) // (cls.workers * 4))
+        results = cls.pool.imap(_run_job, pairs, chunksize=chunksize)
+        scores = {}
+        for pair, score in tqdm(zip(pairs, results), total=len(pairs), desc="Fitness", leave=False):
+            scores[pair] = score
+            FitnessCache.put(*pair, score)
+        return scores
+
+    @classmethod
+    def run(cls, w_codes:list, samples:dict) -> tuple[np.ndarray, np.ndarray]:
+        # (wrongs x samples x 4) scores, samples same as the wrong are masked out.
+        # Scores of this call are kept here, the cache may evict them meanwhile
+        r_codes = list(samples.values())
+        scores = {}
+        pairs = {}
+        for w_code in w_codes:
+            for r_code in r_codes:
+                if r_code == w_code or (w_code, r_code) in scores or (w_code, r_code) in pairs: continue
+                score = FitnessCache.get(w_code, r_code)
+                if score is None:
+                    pairs[(w_code, r_code)] = None
+                else:
+                    scores[(w_code, r_code)] = score
+        scores.update(cls.__compute(list(pairs)))
+
+        matrix = np.zeros((len(w_codes), len(r_codes), 4))
+        valid = np.zeros((len(w_codes), len(r_codes)), dtype=bool)
+        for i, w_code in enumerate(w_codes):
+            for j, r_code in enumerate(r_codes):
+                if r_code == w_code: continue
+                matrix[i, j] = list(scores[(w_code, r_code)].values())
+                valid[i, j] = True
+        return matrix, valid
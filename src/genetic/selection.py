@@ -1,12 +1,22 @@
 import numpy as np
-import pandas as pd
-from paretoset import paretoset
 from tqdm import tqdm
 
 from .fitness import Fitness
+from .fitnessMatrix import FitnessMatrix
 from ..utils import Randoms
 
 class Selection:
+    reference_points = np.array([
+        [1.0, 1.0, 1.0, 1.0], # Best of All Objects
+        [1.0, 0.0, 0.0, 0.0], # Best of First Object
+        [0.0, 1.0, 0.0, 0.0], # Best of Second Object
+        [0.0, 0.0, 1.0, 0.0], # Best of Third Object
+        [0.0, 0.0, 0.0, 1.0], # Best of Fourth Object
+        ])
+    # Max elements of the (wrongs x samples x samples x objects) comparison of one chunk
+    chunk_elements = 2 ** 25
+    tie_tolerance = 1e-9
+
     def __init__(self, wrongs:dict, corrects:dict):
         self.wrongs = wrongs
         self.corrects = corrects
@@ -28,37 +38,62 @@ class Selection:
                        if score == max_trace_score]
         return max_r_list[0]
     
-    def nsga_iii(self, w_code:str, samples:dict) -> str:
-        # Paretoset
-        scores = {r_id: list(Fitness.run(w_code, r_code).values()) 
-                  for r_id, r_code in samples.items()
-                  if r_code != w_code}
-        scores_df = pd.DataFrame.from_dict(scores, orient='index')
-        pareto_set = paretoset(scores_df, sense=["max", "max", "max", "max"])
-        fronts = scores_df[pareto_set].index.tolist()
+    def fitness_tensor(self, w_codes:list, samples:dict) -> tuple[np.ndarray, np.ndarray]:
+        return FitnessMatrix.run(w_codes, samples)
+
+    def pareto_fronts(self, scores:np.ndarray, valid:np.ndarray) -> np.ndarray:
+        # Maximizing every objective, only the first of duplicated scores is in the front
+        n_samples = scores.shape[1]
+        chunk = max(1, self.chunk_elements // max(1, n_samples * n_samples * scores.shape[2]))
+        earlier = np.tri(n_samples, k=-1, dtype=bool)
+        fronts = np.zeros(valid.shape, dtype=bool)
+        for start in range(0, len(scores), chunk):
+            s = scores[start:start+chunk]
+            v = valid[start:start+chunk]
+            # [w, i, j]: j compared with i
+            ge = (s[:, None, :, :] >= s[:, :, None, :]).all(axis=-1) & v[:, None, :]
+            gt = (s[:, None, :, :] > s[:, :, None, :]).any(axis=-1)
+            eq = (s[:, None, :, :] == s[:, :, None, :]).all(axis=-1) & v[:, None, :]
+            dominated = (ge & gt).any(axis=-1)
+            duplicated = (eq & earlier).any(axis=-1)
+            fronts[start:start+chunk] = v & ~dominated & ~duplicated
+        return fronts
+
+    def reference_directions(self) -> np.ndarray:
+        return np.array([reference_point / np.linalg.norm(reference_point) 
+                         for reference_point in self.reference_points])
 
-        # NSGA3
-        r_candidates = []
-        reference_points = np.array([
-            [1.0, 1.0, 1.0, 1.0], # Best of All Objects
-            [1.0, 0.0, 0.0, 0.0], # Best of First Object
-            [0.0, 1.0, 0.0, 0.0], # Best of Second Object
-            [0.0, 0.0, 1.0, 0.0], # Best of Third Object
-            [0.0, 0.0, 0.0, 1.0], # Best of Fourth Object
-            ])
-        for reference_point in reference_points:
-            # Distance from reference directions
-            reference_direction = reference_point / np.linalg.norm(reference_point)
-            r_distance_dict = {}
-            for r_id in fronts:
-                r_point = scores[r_id]
-                distances = self.__perpendicular_distance(r_point, reference_direction)
-                r_distance_dict[r_id] = distances
-            min_distance = min(r_distance_dict.values())
-            min_r_list = [r_id for r_id, score in r_distance_dict.items() 
-                           if score == min_distance]
-            r_candidates.extend(min_r_list)
-        return Randoms.choice(r_candidates)
+    def reference_distances(self, scores:np.ndarray) -> np.ndarray:
+        # (wrongs x samples x references) perpendicular distances from reference directions
+        directions = self.reference_directions()
+        projection_lengths = scores @ directions.T
+        projections = projection_lengths[..., None] * directions
+        perpendicular_vectors = scores[..., None, :] - projections
+        return np.linalg.norm(perpendicular_vectors, axis=-1)
+
+    def nsga_iii_batch(self, w_codes:list, samples:dict) -> list[str]:
+        r_ids = list(samples.keys())
+        scores, valid = self.fitness_tensor(w_codes, samples)
+        fronts = self.pareto_fronts(scores, valid)
+        directions = self.reference_directions()
+        distances = np.where(fronts[..., None], self.reference_distances(scores), np.inf)
+        # Batched distances may differ in the last bits, so ties are decided exactly
+        nearests = distances <= distances.min(axis=1, keepdims=True) + self.tie_tolerance
+        selected = []
+        for i in tqdm(range(len(w_codes)), desc="Select", leave=False):
+            # Candidates nearest to each reference direction, in reference and sample order
+            r_candidates = []
+            for k, direction in enumerate(directions):
+                near = np.flatnonzero(nearests[i, :, k])
+                if len(near) > 1:
+                    exacts = [self.__perpendicular_distance(scores[i, j], direction) for j in near]
+                    near = [j for j, exact in zip(near, exacts) if exact == min(exacts)]
+                r_candidates.extend(r_ids[j] for j in near)
+            selected.append(Randoms.choice(r_candidates))
+        return selected
+
+    def nsga_iii(self, w_code:str, samples:dict) -> str:
+        return self.nsga_iii_batch([w_code], samples)[0]
     
     def __perpendicular_distance(self, point, direction):
         point = np.array(point)
@@ -68,7 +103,6 @@ class Selection:
         perpendicular_vector = point - projection
         return np.linalg.norm(perpendicular_vector)
     
-    
     def run(self, population:dict, pop_size:int, solutions:dict=dict()) -> dict:
         # Select parents as large as pop_size with NSGA-iii
         wrongs = []
@@ -95,6 +129,6 @@ class Selection:
             samples.extend([p_id for p_id in Randoms.sample(wrongs, pop_size)])
         
         samples = {p_id:population[p_id] for p_id in samples}
-        return {p_id:self.nsga_iii(population[p_id], samples) 
-                for p_id in tqdm(wrongs, desc="Select", leave=False)}
+        w_codes = [population[p_id] for p_id in wrongs]
+        return dict(zip(wrongs, self.nsga_iii_batch(w_codes, samples)))
     
@@ -3,4 +3,5 @@ from .nodeParser import NodeParser
 from .swtVariables import SWTVariables
 from .variableMap import VariableMap
 from .nodeMap import NodeMap
-from .exceptHandler import ExceptHandler
\ No newline at end of file
+from .exceptHandler import ExceptHandler
+from .traceInstrumenter import TraceInstrumenter
\ No newline at end of file
@@ -1,27 +1,21 @@
 import ast
 from collections import Counter
 
-from .nodeParser import NodeParser
-from ..utils import Randoms, TED, divide
+from ..utils import Randoms, TED, LCS, FlatTree, divide
 
 class NodeMap:
 
     def __init__(self, a_tree:ast, b_tree:ast):
         a_tree = ast.parse(a_tree) if type(a_tree) == str else a_tree
         b_tree = ast.parse(b_tree) if type(b_tree) == str else b_tree
-        self.a_np:NodeParser = self.__make_node_parser(a_tree)
-        self.b_np:NodeParser = self.__make_node_parser(b_tree)
+        self.a_tree = FlatTree(a_tree)
+        self.b_tree = FlatTree(b_tree)
+        self.a_line_node_map = self.a_tree.line_node_map
+        self.b_line_node_map = self.b_tree.line_node_map
 
-
-    def __make_node_parser(self, tree:ast) -> NodeParser:
-        np = NodeParser()
-        np.run(tree=tree)
-        return np
-    
-    def __get_trace_node_map(self, node_parser:NodeParser, traces:list) -> dict:
-        line_node_map = node_parser.line_node_map
+    def __get_trace_node_map(self, line_node_map:dict, traces:list) -> dict:
         trace_node_map = {line_node_map[lineno]:line_node_map[lineno].__class__.__name__ 
-                            for lineno in traces
+                            for lineno in traces.first_seen()
                             if lineno in line_node_map.keys()}
         return trace_node_map
 
@@ -59,31 +53,10 @@ class NodeMap:
             b_nodes.append(k)
             b_node_names.append(v)
         
-        # Initialize a 2D array to store the lengths of LCS
-        dp = [[0] * (len(b_node_names) + 1) for _ in range(len(a_node_names) + 1)]
-
-        # Calculate the dp array
-        for i in range(1, len(a_node_names) + 1):
-            for j in range(1, len(b_node_names) + 1):
-                if a_node_names[i - 1] == b_node_names[j - 1]:
-                    dp[i][j] = dp[i - 1][j - 1] + 1
-                else:
-                    dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
-
         # Node mapping with LCS
         # Crossover: rep Node Mapping
-        i, j = len(a_node_names), len(b_node_names)
-        while i > 0 and j > 0:
-            if a_node_names[i - 1] == b_node_names[j - 1]:
-                a_node = a_nodes[i - 1]
-                b_node = b_nodes[j - 1]
-                rep_node_map[a_node] = b_node
-                i -= 1
-                j -= 1
-            elif dp[i - 1][j] > dp[i][j - 1]:
-                i -= 1
-            else:
-                j -= 1
+        for i, j in LCS.traceback(a_node_names, b_node_names):
+            rep_node_map[a_nodes[i]] = b_nodes[j]
     
         return rep_node_map
     
@@ -154,8 +127,8 @@ class NodeMap:
         while suspiciousness:
             candidate = []
             lineno = self.rolette_wheel(suspiciousness)
-            if lineno in self.a_np.line_node_map.keys():
-                a_node = self.a_np.line_node_map[lineno]
+            if lineno in self.a_line_node_map.keys():
+                a_node = self.a_line_node_map[lineno]
                 if a_node in rep_node_map.keys():
                     candidate.append({'rep':rep_node_map[a_node]})
                 if a_node in ins_node_map.keys():
@@ -173,8 +146,8 @@ class NodeMap:
         ins_node_map_list = []
         del_node_map_list = []
         for tc_no in a_trace_hist.keys():
-            a_trace_node_map = self.__get_trace_node_map(self.a_np, a_trace_hist[tc_no])
-            b_trace_node_map = self.__get_trace_node_map(self.b_np, b_trace_hist[tc_no])
+            a_trace_node_map = self.__get_trace_node_map(self.a_line_node_map, a_trace_hist[tc_no])
+            b_trace_node_map = self.__get_trace_node_map(self.b_line_node_map, b_trace_hist[tc_no])
             rep_node_map = self.rep_node_map(a_trace_node_map, b_trace_node_map)
             rep_node_map_list.append(rep_node_map)
             ins_node_map_list.append(self.ins_node_map(rep_node_map, b_trace_node_map))
@@ -188,10 +161,11 @@ class NodeMap:
     
 
     def trace_sim(self, a_trace:list, b_trace:list):
-        rep_node_map = self.rep_node_map(
-            self.__get_trace_node_map(self.a_np, a_trace), 
-            self.__get_trace_node_map(self.b_np, b_trace))
-        return divide(len(rep_node_map), max(len(a_trace), len(b_trace)))
+        # Mapped nodes of rep_node_map are as many as the LCS of node names
+        lcs = LCS.length(
+            list(self.__get_trace_node_map(self.a_line_node_map, a_trace).values()), 
+            list(self.__get_trace_node_map(self.b_line_node_map, b_trace).values()))
+        return divide(lcs, max(len(a_trace), len(b_trace)))
         trace_sim = 0
         for a_node, b_node in rep_node_map.items():
             if isinstance(a_node, (ast.Try, ast.TryStar)):
@@ -0,0 +1,180 @@
+import ast
+import sys
+
+LINE_FUNC = '__mentored_line__'
+ITER_FUNC = '__mentored_iter__'
+COMP_FUNC = '__mentored_comp__'
+EXCEPT_FUNC = '__mentored_except__'
+RAISE_FUNC = '__mentored_raise__'
+ERROR_FUNC = '__mentored_error__'
+EXIT_FUNC = '__mentored_exit__'
+RETURN_FUNC = '__mentored_return__'
+TRACE_FLAG = '__mentored_on__'
+
+
+class TraceInstrumenter(ast.NodeTransformer):
+    # Insert recording calls where settrace has line, return and exception events:
+    # statement heads, loop checks, except clauses and the exits of every frame
+    def __init__(self, driver:bool=False):
+        self.driver = driver
+
+    def __call(self, func:str, *args) -> ast.Call:
+        return ast.Call(
+            func=ast.Name(id=func, ctx=ast.Load()),
+            args=list(args),
+            keywords=[])
+
+    def __line_call(self, func:str, lineno:int, *args) -> ast.Call:
+        return self.__call(func, ast.Constant(lineno), ast.Constant(self.driver), *args)
+
+    def __flag(self) -> ast.Name:
+        return ast.Name(id=TRACE_FLAG, ctx=ast.Load())
+
+    def __guard(self, call:ast.Call, node) -> ast.If:
+        # Recording is skipped with a single global check when traces are full
+        record = ast.If(test=self.__flag(), body=[ast.Expr(value=call)], orelse=[])
+        return ast.copy_location(record, node)
+
+    def __record(self, node, lineno:int=None) -> ast.If:
+        return self.__guard(self.__line_call(LINE_FUNC, lineno or node.lineno), node)
+
+    def __instrument_body(self, body:list) -> list:
+        new_body = []
+        for stmt in body:
+            stmt = self.visit(stmt)
+            # Test of while loop records its own line for every check,
+            # declarations have no bytecode
+            if not isinstance(stmt, (ast.While, ast.Global, ast.Nonlocal)):
+                new_body.append(self.__record(stmt))
+            if isinstance(stmt, ast.Raise) and stmt.exc is not None:
+                # Raising again is a new exception event of the frame
+                new_body.append(self.__guard(self.__call(RAISE_FUNC), stmt))
+            new_body.append(stmt)
+        return new_body
+
+    def __error_handler(self, node) -> ast.ExceptHandler:
+        return ast.ExceptHandler(
+            type=ast.Name(id='BaseException', ctx=ast.Load()), name=None,
+            body=[self.__guard(self.__call(ERROR_FUNC), node), ast.Raise()])
+
+    def __frame_body(self, body:list, node) -> list:
+        # Every frame counts its return, and an exception leaving it
+        # unless an except clause of the frame already did
+        frame = ast.Try(body=body, handlers=[self.__error_handler(node)], orelse=[],
+                        finalbody=[self.__guard(self.__call(EXIT_FUNC), node)])
+        return [ast.copy_location(frame, node)]
+
+    def generic_visit(self, node):
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, list) and value and isinstance(value[0], ast.stmt):
+                setattr(node, field, self.__instrument_body(value))
+            elif isinstance(value, list):
+                # Except clauses, match cases and expressions
+                setattr(node, field, [self.visit(item) if isinstance(item, ast.AST) else item
+                                      for item in value])
+            elif isinstance(value, ast.AST):
+                # Comprehensions and lambdas of the statement are frames too
+                setattr(node, field, self.visit(value))
+        return node
+
+    def visit_Module(self, node):
+        # Future imports stay at the top of the module
+        futures = 0
+        while futures < len(node.body) and isinstance(node.body[futures], ast.ImportFrom) \
+            and node.body[futures].module == '__future__':
+            futures += 1
+        body = node.body[futures:]
+        node.body = node.body[:futures]
+        if body:
+            node.body += self.__frame_body(self.__instrument_body(body), body[0])
+        return node
+
+    def visit_FunctionDef(self, node):
+        node = self.generic_visit(node)
+        node.body = self.__frame_body(node.body, node)
+        return node
+
+    def visit_AsyncFunctionDef(self, node):
+        return self.visit_FunctionDef(node)
+
+    def visit_ClassDef(self, node):
+        # Class body starts with an event on the class line
+        node = self.generic_visit(node)
+        node.body = self.__frame_body([self.__record(node)] + node.body, node)
+        return node
+
+    def visit_Lambda(self, node):
+        # Event on the lambda line when called, then its return
+        node = self.generic_visit(node)
+        record = ast.BoolOp(op=ast.And(), values=[self.__flag(), self.__line_call(LINE_FUNC, node.lineno)])
+        value = ast.Subscript(value=ast.Tuple(elts=[record, node.body], ctx=ast.Load()),
+                              slice=ast.Constant(1), ctx=ast.Load())
+        node.body = self.__call(RETURN_FUNC, value)
+        return node
+
+    def visit_Yield(self, node):
+        # Yield returns from the frame
+        node = self.generic_visit(node)
+        node.value = self.__call(RETURN_FUNC, node.value or ast.Constant(None))
+        return node
+
+    def visit_For(self, node):
+        # Header line is visited again before every next item and at the end of loop
+        node.iter = self.__line_call(ITER_FUNC, node.lineno, node.iter)
+        return self.generic_visit(node)
+
+    def visit_AsyncFor(self, node):
+        return self.generic_visit(node)
+
+    def visit_While(self, node):
+        record = ast.BoolOp(op=ast.And(), values=[self.__flag(), self.__line_call(LINE_FUNC, node.lineno)])
+        record = ast.BoolOp(op=ast.Or(), values=[record, ast.Constant(True)])
+        node.test = ast.BoolOp(op=ast.And(), values=[record, node.test])
+        return self.generic_visit(node)
+
+    def visit_With(self, node):
+        # Leaving the block visits the with line again,
+        # an exception of the block is counted before the context manager may suppress it
+        node = self.generic_visit(node)
+        block = ast.Try(body=node.body, handlers=[self.__error_handler(node)], 
+                        orelse=[], finalbody=[self.__record(node)])
+        node.body = [ast.copy_location(block, node)]
+        return node
+
+    def visit_ExceptHandler(self, node):
+        # Each tested clause has an event, the first one also counts the exception
+        node = self.generic_visit(node)
+        node.type = self.__line_call(EXCEPT_FUNC, node.lineno,
+                                     node.type or ast.Name(id='BaseException', ctx=ast.Load()))
+        return node
+
+    def __visit_comprehension(self, node):
+        # Comprehension checks its line before every next item of each generator.
+        # Generator expressions, and others before python 3.12, run in their own frame
+        # which also has an event on start and returns at the end (and on every yield)
+        own_frame = isinstance(node, ast.GeneratorExp) or sys.version_info < (3, 12)
+        node = self.generic_visit(node)
+        first, *others = node.generators
+        first.iter = self.__line_call(COMP_FUNC, node.lineno, ast.Constant(own_frame), first.iter)
+        for generator in others:
+            generator.iter = self.__line_call(ITER_FUNC, node.lineno, generator.iter)
+        if isinstance(node, ast.GeneratorExp):
+            node.elt = self.__call(RETURN_FUNC, node.elt)
+        return node
+
+    def visit_ListComp(self, node):
+        return self.__visit_comprehension(node)
+
+    def visit_SetComp(self, node):
+        return self.__visit_comprehension(node)
+
+    def visit_DictComp(self, node):
+        return self.__visit_comprehension(node)
+
+    def visit_GeneratorExp(self, node):
+        return self.__visit_comprehension(node)
+
+    def run(self, code:str='', tree:ast=''):
+        if code: tree = ast.parse(code)
+        tree = self.visit(tree)
+        return ast.fix_missing_locations(tree)
@@ -1,7 +1,7 @@
 from collections import Counter
 
 from .nodeParser import NodeParser
-from ..utils import Randoms
+from ..utils import Randoms, LCS, Truncated, Snapshot
 
 class VariableMap:
     def __init__(self, tc_id_list:list=[]):
@@ -47,48 +47,49 @@ class VariableMap:
                 self.var_map[b_var] = chosen_a_var
 
     def dea_var_map(self):
-        # Map variables based on dynamic equivalence analysis
-        var_map_list = []
-        for b_var in self.b_var_name_list:
+        # Map variables based on dynamic equivalence analysis,
+        # equal value histories of a testcase are joined by their keys
+        a_var_index = {a_var:i for i, a_var in enumerate(self.a_var_name_list)}
+        matched = {}
+        for tc_id in self.tc_id_list:
+            buckets = {}
             for a_var in self.a_var_name_list:
-                is_matched = False
-                for tc_id in self.tc_id_list:
-                    if b_var not in self.b_var_hist[tc_id] or a_var not in self.a_var_hist[tc_id]:
-                        continue
-                    b_var_values = self.get_var_value_sequence(self.b_var_hist[tc_id][b_var])
-                    a_var_values = self.get_var_value_sequence(self.a_var_hist[tc_id][a_var])
-                    if self.__is_hist_equal(b_var_values, a_var_values):
-                        is_matched = True
-                        break
-                if is_matched:
-                    var_map_list.append({b_var:a_var})
+                if a_var not in self.a_var_hist[tc_id]: continue
+                key = self.__hist_key(self.a_var_hist[tc_id][a_var])
+                if key is not None:
+                    buckets.setdefault(key, []).append(a_var)
+            for b_var in self.b_var_name_list:
+                if b_var not in self.b_var_hist[tc_id]: continue
+                key = self.__hist_key(self.b_var_hist[tc_id][b_var])
+                if key in buckets:
+                    matched.setdefault(b_var, set()).update(buckets[key])
+        var_map_list = [{b_var:a_var} 
+                        for b_var in self.b_var_name_list if b_var in matched
+                        for a_var in sorted(matched[b_var], key=a_var_index.get)]
         self.get_most_matched_var_map(var_map_list)
         return self.var_map
     
-    def __is_hist_equal(self, hist_a, hist_b):
-        if len(hist_a) != len(hist_b):
-            return False
-        for i in range(len(hist_a)):
-            if not self.__is_equal(hist_a[i], hist_b[i]):
-                return False
-        return True
-
-    def __is_equal(self, object_a, object_b):
-        if str(type(object_a)) == str(type(object_b)):
-            if object_a == object_b:
-                return True
-            else:
-                return False
-        else:
-            close_type_list = ["<class 'list'>", "<class 'tuple'>"]
-            if str(type(object_a)) in close_type_list and \
-                    str(type(object_b)) in close_type_list:
-                if list(object_a) == list(object_b):
-                    return True
-                else:
-                    return False
-            else:
-                return False
+    def __hist_key(self, hist:list):
+        # Histories are equal when their keys are, None never equals.
+        # Histories cut by the value limit are compared on their recorded values
+        values = self.get_var_value_sequence(hist)
+        cut = bool(values) and isinstance(values[-1], Truncated) and values[-1].cut
+        if cut: values = values[:-1]
+        keys = []
+        for value in values:
+            key = self.__value_key(value)
+            if key is None: return None
+            keys.append(key)
+        return cut, tuple(keys)
+
+    def __value_key(self, value):
+        # Values of the same type are equal with same snapshot, lists and tuples with same items.
+        # Truncated values never equal
+        if not isinstance(value, Snapshot):
+            return None
+        if value.type in ['list', 'tuple']:
+            return 'sequence', value.items()
+        return value.type, value.key
             
 
     def lcs_var_map(self) -> dict:
@@ -114,36 +115,7 @@ class VariableMap:
         return self.var_map
     
     def lcs(self, lst1, lst2):
-        # Get the lengths of both input lists
-        m, n = len(lst1), len(lst2)
-        # Initialize a 2D table 'jh' to store the lengths of common subsequences
-        jh = [[0 for j in range(n+1)] for i in range(m+1)]
-
-        # Fill in the 'jh' table using dynamic programming
-        for i in range(1, m+1):
-            for j in range(1, n+1):
-                if lst1[i-1] == lst2[j-1]:
-                    jh[i][j] = 1 + jh[i-1][j-1]
-                else:
-                    jh[i][j] = max(jh[i-1][j], jh[i][j-1])
-
-        # Initialize a result list to store the common subsequence
-        result = []
-        i, j = m, n
-
-        # Reconstruct the longest common subsequence
-        while i > 0 and j > 0:
-            if lst1[i-1] == lst2[j-1]:
-                result.append(lst1[i-1])
-                i -= 1
-                j -= 1
-            elif jh[i-1][j] > jh[i][j-1]:
-                i -= 1
-            else:
-                j -= 1
-
-        # Return the result list in reverse order to get the correct sequence
-        return len(result[::-1])
+        return LCS.length(lst1, lst2)
     
 
     def type_var_map(self):
@@ -164,9 +136,8 @@ class VariableMap:
                 values = self.get_var_value_sequence(data)
                 if var in var_type_dict.keys(): continue
                 for v in values:
-                    try: v = eval(v)
-                    except: pass
-                    var_type_dict.setdefault(var, set()).add(type(v).__name__)
+                    if isinstance(v, Truncated): continue
+                    var_type_dict.setdefault(var, set()).add(v.type)
                     break
         return var_type_dict
     
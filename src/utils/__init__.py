@@ -1,6 +1,11 @@
 from .regularize import Regularize
+from .codeCache import CodeCache
+from .flatTree import FlatTree
 from .randoms import Randoms
 from .ted import TED
+from .lcs import LCS
+from .boundedRepr import BoundedRepr, Truncated
+from .snapshot import Snapshot
 from .database import Database, DBKey
 from .etc import get_stmt_list, divide, extract_number
 from .log import Log
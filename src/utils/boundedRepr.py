@@ -0,0 +1,172 @@
+CONTAINERS = (list, tuple, dict, set, frozenset)
+# Digits of int are at least (bits - 1) * log10(2)
+LOG10_2 = 0.30103
+# Nesting measured by recursion, deeper values are written item by item
+MAX_DEPTH = 50
+
+
+class Truncated:
+    # Value which is not fully recorded, it only equals itself
+    def __init__(self, text:str='', cut:bool=False):
+        self.text = text
+        # The history of the variable is cut after this marker
+        self.cut = cut
+
+    def __repr__(self) -> str:
+        return '<cut>' if self.cut else f'{self.text}...'
+
+
+class Overflow(Exception):
+    pass
+
+
+class Deep(Exception):
+    pass
+
+
+class Item:
+    # Value inside a container which is written by repr()
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class BoundedRepr:
+    # str() of a value within a budget of characters,
+    # the value is truncated only when its str() is longer than the budget.
+    # Builtin containers are written item by item and never walked past the budget
+    def __init__(self, limit:int=1000):
+        self.limit = limit
+
+    @classmethod
+    def __tokens(cls, value):
+        if type(value) is list:
+            yield '['
+            for i, item in enumerate(value):
+                if i: yield ', '
+                yield Item(item)
+            yield ']'
+        elif type(value) is tuple:
+            yield '('
+            for i, item in enumerate(value):
+                if i: yield ', '
+                yield Item(item)
+            yield ',)' if len(value) == 1 else ')'
+        elif type(value) is dict:
+            yield '{'
+            for i, (k, v) in enumerate(value.items()):
+                if i: yield ', '
+                yield Item(k)
+                yield ': '
+                yield Item(v)
+            yield '}'
+        else:
+            name = type(value).__name__
+            if not value:
+                yield f'{name}()'
+                return
+            yield '{' if type(value) is set else f'{name}({{'
+            for i, item in enumerate(value):
+                if i: yield ', '
+                yield Item(item)
+            yield '}' if type(value) is set else '})'
+
+    def __leaf(self, value, room:int) -> str:
+        # Large strings and ints are not written to know they overflow
+        if type(value) in (str, bytes) and len(value) + 2 > room:
+            raise Overflow
+        if type(value) is int and (value.bit_length() - 1) * LOG10_2 > room:
+            raise Overflow
+        try:
+            return repr(value)
+        except ValueError:
+            # Ints over the digits limit of the interpreter
+            raise Overflow
+
+    def __size(self, value, room:int, depth:int, active:set) -> int:
+        # Length of str() of a builtin container, raises Overflow past room
+        if depth > MAX_DEPTH:
+            raise Deep
+        kind = type(value)
+        n = len(value)
+        if id(value) in active:
+            return 5
+        if kind is dict:
+            items = [x for item in value.items() for x in item]
+            size = 2 + 2 * max(n - 1, 0) + 2 * n
+        else:
+            items = value
+            if kind is tuple:
+                size = 2 + 2 * max(n - 1, 0) + (n == 1)
+            elif kind is set:
+                size = 2 + 2 * (n - 1) if n else 5
+            elif kind is frozenset:
+                size = 13 + 2 * (n - 1) if n else 11
+            else:
+                size = 2 + 2 * max(n - 1, 0)
+        if size > room:
+            raise Overflow
+        active.add(id(value))
+        for item in items:
+            if type(item) in CONTAINERS:
+                size += self.__size(item, room - size, depth + 1, active)
+            else:
+                size += len(self.__leaf(item, room - size))
+            if size > room:
+                raise Overflow
+        active.discard(id(value))
+        return size
+
+    def __write(self, value, pieces:list):
+        size = 0
+        def emit(text:str):
+            nonlocal size
+            pieces.append(text)
+            size += len(text)
+            if size > self.limit:
+                raise Overflow
+        stack = [(iter([Item(value)]), None)]
+        # Containers being written, a recursive one is written as Python does
+        active = set()
+        while stack:
+            token = next(stack[-1][0], None)
+            if token is None:
+                active.discard(stack.pop()[1])
+            elif isinstance(token, str):
+                emit(token)
+            elif type(token.value) in CONTAINERS:
+                if id(token.value) in active:
+                    emit('[...]' if type(token.value) is list else '{...}')
+                else:
+                    active.add(id(token.value))
+                    stack.append((self.__tokens(token.value), id(token.value)))
+            else:
+                emit(self.__leaf(token.value, self.limit - size))
+
+    def run(self, value):
+        if isinstance(value, str):
+            text = value
+        elif isinstance(value, int) and not isinstance(value, bool):
+            if (value.bit_length() - 1) * LOG10_2 > self.limit:
+                return Truncated()
+            try:
+                text = str(value)
+            except ValueError:
+                return Truncated()
+        elif type(value) in CONTAINERS:
+            try:
+                self.__size(value, self.limit, 0, set())
+                text = str(value)
+            except (Overflow, Deep):
+                pieces = []
+                try:
+                    self.__write(value, pieces)
+                except Overflow:
+                    return Truncated(''.join(pieces)[:self.limit])
+                text = ''.join(pieces)
+        else:
+            text = str(value)
+        if len(text) > self.limit:
+            return Truncated(text[:self.limit])
+        return text
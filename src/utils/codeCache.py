@@ -0,0 +1,120 @@
+import ast
+import threading
+from collections import OrderedDict
+
+from .regularize import Regularize
+
+
+class CodeCache:
+    # Bounded LRU caches of every stage of a program,
+    # raw code -> regularized code -> parsed/handled code -> compiled code object
+    max_size = 4096
+    caches = {}
+    hits = {}
+    misses = {}
+    # Stages holding label ids of FlatTree, cleared with its labels
+    label_stages = ('flat_tree', 'ted_histogram')
+    lock = threading.Lock()
+
+    @classmethod
+    def init_cache(cls, max_size:int=None):
+        from .flatTree import FlatTree
+        with cls.lock:
+            if max_size is not None:
+                cls.max_size = max_size
+            cls.caches = {}
+            cls.hits = {}
+            cls.misses = {}
+            FlatTree.init_labels()
+
+    @classmethod
+    def clear(cls, *stages:str):
+        from .flatTree import FlatTree
+        labels = any(stage in cls.label_stages for stage in stages)
+        if labels:
+            stages = set(stages) | set(cls.label_stages)
+        with cls.lock:
+            for stage in stages:
+                cls.caches.pop(stage, None)
+                cls.hits.pop(stage, None)
+                cls.misses.pop(stage, None)
+            if labels:
+                FlatTree.init_labels()
+
+    @classmethod
+    def get(cls, stage:str, key, func):
+        with cls.lock:
+            cache = cls.caches.setdefault(stage, OrderedDict())
+            if key in cache:
+                cache.move_to_end(key)
+                cls.hits[stage] = cls.hits.get(stage, 0) + 1
+                return cache[key]
+        # Compute without lock, a race only computes the same value twice
+        value = func()
+        with cls.lock:
+            cls.misses[stage] = cls.misses.get(stage, 0) + 1
+            cache[key] = value
+            if len(cache) > cls.max_size:
+                cache.popitem(last=False)
+        return value
+
+    @classmethod
+    def put(cls, stage:str, key, value):
+        with cls.lock:
+            cache = cls.caches.setdefault(stage, OrderedDict())
+            cache[key] = value
+            cache.move_to_end(key)
+            if len(cache) > cls.max_size:
+                cache.popitem(last=False)
+
+    @classmethod
+    def regularize(cls, code:str) -> str:
+        return Regularize.run(code)
+
+    @classmethod
+    def parse(cls, code:str) -> ast.Module:
+        # Shared tree, transformers must parse their own
+        return cls.get('parse', code, lambda: ast.parse(code))
+
+    @classmethod
+    def flat_tree(cls, code:str):
+        from .flatTree import FlatTree
+        return cls.get('flat_tree', code, lambda: FlatTree(cls.parse(code)))
+
+    @classmethod
+    def node_parser(cls, code:str):
+        # Shared NodeParser, only read its results
+        from ..transform import NodeParser
+        def parse():
+            np = NodeParser()
+            np.run(code)
+            return np
+        return cls.get('node_parser', code, parse)
+
+    @classmethod
+    def handle(cls, code:str) -> tuple[str, dict]:
+        from ..transform import ExceptHandler
+        def handle():
+            eh = ExceptHandler()
+            handle_code = eh.run(code)
+            return handle_code, eh.new_line_map
+        return cls.get('handle', code, handle)
+
+    @classmethod
+    def compile(cls, code:str, filename:str='<string>', compiler=None):
+        if compiler is None:
+            return cls.get('compile', (code, filename),
+                           lambda: compile(code, filename, 'exec'))
+        return cls.get('compile', (code, filename, compiler),
+                       lambda: compiler(code, filename))
+
+    @classmethod
+    def stats(cls) -> dict:
+        stats = {}
+        with cls.lock:
+            for stage, cache in cls.caches.items():
+                hits = cls.hits.get(stage, 0)
+                misses = cls.misses.get(stage, 0)
+                stats[stage] = {'size': len(cache), 'hits': hits, 'misses': misses,
+                                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0}
+        return stats
@@ -9,10 +9,12 @@ import os
 
 from .database import Database, DBKey
 from .ted import TED
+from .codeCache import CodeCache
 from .etc import divide
 
 from ..approaches import MENTORED, PYDEX
 from ..execution import Tester, CodeQuality
+from ..genetic import FitnessMatrix, FitnessCache
 
 
 class Experiments:
@@ -20,7 +22,12 @@ class Experiments:
                  generations:int=30, trials:int=10, 
                  correct:bool=False, timeout:int=1, 
                  approach:str='mentored', multi:bool=False,
-                 reset:bool=False):
+                 reset:bool=False, backend:str='serial',
+                 workers:int=None, batch:bool=False,
+                 cache_dir:str=None, tracer:str='settrace',
+                 isolation:str='signal', memory_limit:int=None,
+                 fitness_workers:int=None, fitness_cache_size:int=None,
+                 trace_limit:int=100, value_limit:int=1000, repr_limit:int=1000):
         
         self.generations = generations
         self.trials = trials
@@ -29,8 +36,21 @@ class Experiments:
         self.approach = approach
         self.multi = multi
         self.reset = reset
+        self.backend = backend
+        self.workers = workers
+        self.batch = batch
+        self.cache_dir = cache_dir
+        self.tracer = tracer
+        self.isolation = isolation
+        self.memory_limit = memory_limit
+        self.fitness_workers = fitness_workers
+        self.fitness_cache_size = fitness_cache_size
+        self.trace_limit = trace_limit
+        self.value_limit = value_limit
+        self.repr_limit = repr_limit
         self.experiment_db_file = 'experiment.json'
         self.results_db_file = 'results.json'
+        self.stats_file = 'testcase_stats.json'
         
 
     def __setup_dataset(self, dataset):
@@ -51,6 +71,7 @@ class Experiments:
             os.path.join(dataset_dir, 'feedbacks', self.approach, self.results_db_file)
         self.feedback_db_path = \
             os.path.join(dataset_dir, 'feedbacks', self.approach)
+        self.stats_path = os.path.join(dataset_dir, self.stats_file)
         os.makedirs(self.feedback_db_path, exist_ok=True)
         
         self.experiment_db = Database(self.experiment_db_file, save=False)
@@ -67,6 +88,9 @@ class Experiments:
             os.path.join(dataset_dir, self.results_db_file)
         if os.path.isfile(results_db_path):
             os.remove(results_db_path)
+        stats_path = os.path.join(dataset_dir, self.stats_file)
+        if os.path.isfile(stats_path):
+            os.remove(stats_path)
         feedbacks_path = os.path.join(dataset_dir, 'feedbacks', self.approach)
         if os.path.isdir(feedbacks_path):
             shutil.rmtree(feedbacks_path)
@@ -80,25 +104,29 @@ class Experiments:
         # Results
         solutions = {}
         results = feedback_table.search(Query().solution == True)
-        for solution in tqdm(results, desc="Save", leave=False):
+        for solution in results:
             wrong_id = solution['wrong_id']
             origin_w_id = wrong_id.rsplit('_', 1)[0]
-            solutions.setdefault(origin_w_id, {})
-            wrong = self.wrongs[origin_w_id]
-            patch = solution['patch']
-            rps = TED.relative_patch_size(wrong, patch)
-            quality = CodeQuality.check(patch)
-            solutions[origin_w_id][rps] = divide(quality, 10)
-            with lock:
-                feedback_table.update(
-                    {DBKey.rps:rps, DBKey.quality:quality}, 
-                    doc_ids=[solution.doc_id])
+            solutions.setdefault(origin_w_id, []).append(solution)
         
         total_rps = 0
         total_quality = 0
-        for rps_quality in solutions.values():
-            total_rps += min(rps_quality.keys())
-            total_quality += max(rps_quality.values())
+        for origin_w_id, w_solutions in tqdm(solutions.items(), desc="Save", leave=False):
+            wrong = self.wrongs[origin_w_id]
+            # Patch sizes of the solutions which could be the smallest,
+            # the others are only computed for their own record
+            rps_map = TED.relative_patch_sizes(wrong, [solution['patch'] for solution in w_solutions])
+            qualities = []
+            for i, solution in enumerate(w_solutions):
+                quality = CodeQuality.check(solution['patch'])
+                qualities.append(divide(quality, 10))
+                rps = rps_map[i] if i in rps_map else TED.relative_patch_size(wrong, solution['patch'])
+                fields = {DBKey.rps:rps, DBKey.quality:quality}
+                with lock:
+                    feedback_table.update(fields, doc_ids=[solution.doc_id])
+            total_rps += min(rps_map.values())
+            # Best quality of all solutions of the wrong program
+            total_quality += max(qualities)
         
         with lock:
             results_db_id = self.results_db.insert({
@@ -230,6 +258,19 @@ class Experiments:
         return chains
         
     
+    def __print_cache_stats(self, trial:int):
+        # Hit rates of the fitness and code caches of a trial
+        tqdm.write(f'Trial {trial} fitness cache: {FitnessCache.stats()}')
+        for stage, stats in CodeCache.stats().items():
+            tqdm.write(f'Trial {trial} code cache {stage}: {stats}')
+
+    def __clock(self):
+        # CPU time of child processes is not counted, use the wall clock with them
+        if self.backend == 'pool' or self.isolation == 'fork' or \
+            (self.fitness_workers is not None and self.fitness_workers > 1):
+            return time.perf_counter
+        return time.process_time
+
     def __core(self, trial:int, lock:Lock=Lock()):
         # Generate Feedback
         correct_programs = len(self.corrects) if self.correct else 0
@@ -247,9 +288,20 @@ class Experiments:
         feedback_db_table_path = \
             os.path.join(self.feedback_db_path, feedback_file_name)
         
-        Tester.init_global_data(self.testcases, self.timeout)
+        Tester.init_global_data(self.testcases, self.timeout, 
+                                self.backend, self.workers, self.batch,
+                                self.cache_dir, self.tracer,
+                                self.isolation, self.memory_limit,
+                                self.trace_limit, self.value_limit, self.repr_limit)
+        with lock:
+            Tester.testsuite.load_stats(self.stats_path)
+        # Trees and labels of the former trial are not kept
+        TED.init_cache()
+        FitnessCache.init_global_data(self.fitness_cache_size)
+        FitnessMatrix.init_global_data(self.fitness_workers)
         feedback_db = Database(feedback_db_table_path, save=False)
-        start_time = time.process_time()
+        clock = self.__clock()
+        start_time = clock()
         if self.approach == 'mentored':
             afg = MENTORED(feedback_db, 
                             self.wrongs, 
@@ -259,8 +311,15 @@ class Experiments:
                         self.wrongs, 
                         self.corrects if self.correct else {})
         afg.run(generations=self.generations)
-        time_taken = time.process_time() - start_time
+        time_taken = clock() - start_time
+        self.__print_cache_stats(trial)
+        with lock:
+            # Later trials and runs start with the learned testcase order
+            Tester.testsuite.save_stats(self.stats_path)
         Tester.clear()
+        Tester.shutdown()
+        FitnessMatrix.shutdown()
+        FitnessCache.clear()
     
         result = self.__save_results(trial, time_taken, feedback_db)
         # self.__print_database(result)
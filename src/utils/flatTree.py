@@ -0,0 +1,97 @@
+import ast
+from array import array
+
+# Control flow statements of TED.get_cfs
+CFS_KINDS = (ast.For, ast.While, ast.If, ast.Try, ast.With,
+             ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class FlatTree:
+    # AST in postorder arrays, a node for each AST node and a leaf for each field value.
+    # Kinds are label ids, the class name of a node or str() of a field value
+    __slots__ = ('kinds', 'parents', 'linenos', 'sizes', 'depths', 'hashes',
+                 'lmds', 'keyroots', 'nodes')
+    # Label ids of the trees built since the last reset, see CodeCache.label_stages
+    labels = {}
+    names = []
+
+    def __init__(self, tree:ast.AST):
+        self.kinds = array('i')
+        self.parents = array('i')
+        self.linenos = array('i')
+        self.sizes = array('i')
+        self.depths = array('i')
+        self.hashes = array('q')
+        # Leftmost leaf of each node
+        self.lmds = array('i')
+        # AST node of each node, None for leaves
+        self.nodes = []
+        self.__visit(tree, 0)
+        # Highest node of each leftmost leaf
+        self.keyroots = sorted({lmd:i for i, lmd in enumerate(self.lmds)}.values())
+
+    @classmethod
+    def init_labels(cls):
+        # Trees built before are not comparable with later ones
+        cls.labels = {}
+        cls.names = []
+
+    @classmethod
+    def kind_id(cls, label:str) -> int:
+        if label not in cls.labels:
+            cls.labels[label] = len(cls.names)
+            cls.names.append(label)
+        return cls.labels[label]
+
+    @classmethod
+    def __label(cls, value) -> str:
+        return type(value).__name__ if isinstance(value, ast.AST) else str(value)
+
+    def __visit(self, value, depth:int) -> int:
+        children = []
+        if isinstance(value, ast.AST):
+            for _, field in ast.iter_fields(value):
+                for item in field if isinstance(field, list) else [field]:
+                    children.append(self.__visit(item, depth + 1))
+        i = len(self.kinds)
+        kind = self.kind_id(self.__label(value))
+        for child in children:
+            self.parents[child] = i
+        self.kinds.append(kind)
+        self.parents.append(-1)
+        self.linenos.append(getattr(value, 'lineno', 0) if isinstance(value, ast.AST) else 0)
+        self.depths.append(depth)
+        self.lmds.append(self.lmds[children[0]] if children else i)
+        self.sizes.append(i - self.lmds[i] + 1)
+        self.hashes.append(hash((kind, *(self.hashes[child] for child in children))))
+        self.nodes.append(value if isinstance(value, ast.AST) else None)
+        return i
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def name(self, i:int) -> str:
+        return self.names[self.kinds[i]]
+
+    def preorder(self, i:int) -> int:
+        return i - self.sizes[i] + 1 + self.depths[i]
+
+    def walk(self) -> list:
+        # Same order as ast.walk, nodes of lower depth first
+        return sorted((i for i, node in enumerate(self.nodes) if node is not None),
+                      key=lambda i: (self.depths[i], i))
+
+    def cfs(self) -> list:
+        return [self.name(i) for i in self.walk() if isinstance(self.nodes[i], CFS_KINDS)]
+
+    def line_nodes(self) -> dict:
+        # Same as NodeParser.line_node_map, the last statement of a line in preorder
+        line_nodes = {}
+        for i in sorted(range(len(self)), key=self.preorder):
+            if isinstance(self.nodes[i], ast.stmt):
+                line_nodes[self.linenos[i]] = i
+        return line_nodes
+
+    @property
+    def line_node_map(self) -> dict:
+        return {lineno:self.nodes[i] for lineno, i in self.line_nodes().items()}
@@ -0,0 +1,61 @@
+class LCS:
+    # Bit-parallel LCS (Hyyro), bit j of a row is 0 where the LCS grows at b[j]
+
+    @staticmethod
+    def intern(a:list, b:list) -> tuple[list, list]:
+        # Equal elements to the same int, unhashable values are compared one by one
+        symbols = {}
+        try:
+            return ([symbols.setdefault(x, len(symbols)) for x in a],
+                    [symbols.setdefault(y, len(symbols)) for y in b])
+        except TypeError:
+            values = []
+            def symbol(x):
+                for i, value in enumerate(values):
+                    if value == x: return i
+                values.append(x)
+                return len(values) - 1
+            return [symbol(x) for x in a], [symbol(y) for y in b]
+
+    @staticmethod
+    def __rows(a:list, b:list, keep:bool=False):
+        a, b = LCS.intern(a, b)
+        full = (1 << len(b)) - 1
+        masks = [0] * (max(a + b) + 1)
+        for j, y in enumerate(b):
+            masks[y] |= 1 << j
+        row = full
+        rows = [row] if keep else None
+        for x in a:
+            match = row & masks[x]
+            row = ((row + match) | (row - match)) & full
+            if keep: rows.append(row)
+        return rows if keep else row
+
+    @staticmethod
+    def length(a:list, b:list) -> int:
+        if not a or not b:
+            return 0
+        row = LCS.__rows(a, b)
+        return len(b) - row.bit_count()
+
+    @staticmethod
+    def traceback(a:list, b:list) -> list[tuple[int, int]]:
+        # Matched (i, j) pairs from the end, in the order of the DP table backtrack
+        if not a or not b:
+            return []
+        rows = LCS.__rows(a, b, keep=True)
+        def dp(i, j):
+            return j - (rows[i] & ((1 << j) - 1)).bit_count()
+        pairs = []
+        i, j = len(a), len(b)
+        while i > 0 and j > 0:
+            if a[i - 1] == b[j - 1]:
+                pairs.append((i - 1, j - 1))
+                i -= 1
+                j -= 1
+            elif dp(i - 1, j) > dp(i, j - 1):
+                i -= 1
+            else:
+                j -= 1
+        return pairs
@@ -1,22 +1,39 @@
 import ast
-import re
 
 class Regularize:
     @classmethod
-    def __remove_comments_and_docstrings(cls, code):
-        # Remove single-line comments and strings that are used as comments
-        code = re.sub(r'(?m)^\s*(#.*|\'[^\']*\'|"[^"]*")\s*$', '', code)
-        # Remove multi-line comments and docstrings
-        code = re.sub(r'(?s)(\'\'\'.*?\'\'\')|(""".*?""")', '', code)
-        return code
-    
+    def __is_string(cls, stmt) -> bool:
+        # Docstrings and strings that are used as comments
+        return isinstance(stmt, ast.Expr) and \
+            isinstance(stmt.value, ast.Constant) and isinstance(stmt.value.value, str)
+
+    @classmethod
+    def __remove_docstrings(cls, tree:ast.Module) -> ast.Module:
+        for node in ast.walk(tree):
+            for field in ('body', 'orelse', 'finalbody'):
+                stmts = getattr(node, field, None)
+                if not isinstance(stmts, list) or not stmts: continue
+                kept = [stmt for stmt in stmts if not cls.__is_string(stmt)]
+                # Blocks of only strings keep a pass, else may be dropped
+                if not kept and field != 'orelse' and not isinstance(node, ast.Module):
+                    kept = [ast.Pass()]
+                setattr(node, field, kept)
+        return tree
+
+    @classmethod
+    def regular(cls, code:str) -> str:
+        # Comments are dropped by the parser
+        return ast.unparse(cls.__remove_docstrings(ast.parse(code)))
+
     @classmethod
-    def __regular(cls, code):
-        return ast.unparse(ast.parse(code))
+    def run(cls, code:str) -> str:
+        from .codeCache import CodeCache
+        return CodeCache.get('regularize', code, lambda: cls.__run(code))
 
     @classmethod
-    def run(cls, code):
-        code = cls.__regular(code)
-        code = cls.__remove_comments_and_docstrings(code)
-        return cls.__regular(code)
-    
\ No newline at end of file
+    def __run(cls, code:str) -> str:
+        from .codeCache import CodeCache
+        regular_code = cls.regular(code)
+        # Already regularized code is only a lookup
+        CodeCache.put('regularize', regular_code, regular_code)
+        return regular_code
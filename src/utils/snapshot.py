@@ -0,0 +1,75 @@
+from .boundedRepr import Truncated, MAX_DEPTH
+
+LITERALS = (int, float, complex, bool, str, bytes, type(None))
+
+
+class Snapshot:
+    # Hashable value of a variable taken by the tracer: type name, canonical value
+    # which is equal where the values are equal (==), and the recorded text
+    __slots__ = ('type', 'key', 'text')
+
+    def __init__(self, type:str, key, text:str):
+        self.type = type
+        self.key = key
+        self.text = text
+
+    @classmethod
+    def take(cls, value, text):
+        # text is the str() of the value from BoundedRepr
+        if isinstance(text, Truncated):
+            return text
+        if type(value) in LITERALS:
+            key = value
+        elif type(value) in (list, tuple, dict, set, frozenset):
+            key = cls.canonical(value)
+        else:
+            key = ('object', type(value).__name__, text)
+        return cls(type(value).__name__, key, text)
+
+    @classmethod
+    def canonical(cls, value, active:set=None, depth:int=0):
+        # Lists and tuples are never equal, sets and frozensets are.
+        # A container inside itself is a marker as in its str(),
+        # so is a container nested deeper than BoundedRepr measures
+        if type(value) in LITERALS:
+            return value
+        if active is None:
+            active = set()
+        if id(value) in active:
+            return ('recursive', type(value).__name__)
+        if depth > MAX_DEPTH:
+            return ('truncated', type(value).__name__)
+        active.add(id(value))
+        depth += 1
+        if type(value) is list:
+            key = ('list', tuple(cls.canonical(v, active, depth) for v in value))
+        elif type(value) is tuple:
+            key = ('tuple', tuple(cls.canonical(v, active, depth) for v in value))
+        elif type(value) is dict:
+            key = ('dict', frozenset((cls.canonical(k, active, depth), cls.canonical(v, active, depth))
+                                     for k, v in value.items()))
+        elif type(value) in (set, frozenset):
+            key = ('set', frozenset(cls.canonical(v, active, depth) for v in value))
+        else:
+            key = ('object', type(value).__name__, repr(value))
+        active.discard(id(value))
+        return key
+
+    def items(self) -> tuple:
+        # Elements of list and tuple
+        return self.key[1]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Snapshot) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __getstate__(self):
+        return self.type, self.key, self.text
+
+    def __setstate__(self, state):
+        self.type, self.key, self.text = state
+
+    def __repr__(self) -> str:
+        return repr(self.text) if self.type == 'str' else self.text
@@ -1,58 +1,164 @@
-import ast
 import Levenshtein
-from zss import simple_distance, Node
-from functools import cache
+import numpy as np
+from collections import Counter
+
+from .codeCache import CodeCache
+from .flatTree import FlatTree, CFS_KINDS
 
 class TED:
     @classmethod
     def init_cache(cls):
-        cls._ast_to_tree.cache_clear()
-        cls.get_cfs.cache_clear()
+        # Only the stages of TED, other stages of CodeCache are kept
+        CodeCache.clear('flat_tree', 'ted_cfs', 'ted_histogram', 'ted_postorder_cfs')
         
     @classmethod
-    def __ast_to_tree(cls, node):
+    def _ast_to_tree(cls, code):
+        return CodeCache.flat_tree(code)
+
+    @classmethod
+    def __compute_ast_size(cls, tree):
         """
-        Recursively converts an AST node into a tree format suitable for zss library.
+        Computes the size of the AST tree.
         """
-        if not isinstance(node, ast.AST):
-            return Node(str(node))
-        
-        tree = Node(type(node).__name__)
-        for field, value in ast.iter_fields(node):
-            if isinstance(value, list):
-                for item in value:
-                    tree.addkid(cls.__ast_to_tree(item))
-            elif isinstance(value, ast.AST):
-                tree.addkid(cls.__ast_to_tree(value))
-            else:
-                tree.addkid(Node(str(value)))
-        return tree
+        return len(tree)
     
     @classmethod
-    @cache
-    def _ast_to_tree(cls, code):
-        return cls.__ast_to_tree(ast.parse(code))
+    def __is_same(cls, tree1, i:int, tree2, j:int) -> bool:
+        # Subtrees of same labels and shape
+        li, lj = tree1.lmds[i], tree2.lmds[j]
+        if i - li != j - lj or tree1.kinds[li:i + 1] != tree2.kinds[lj:j + 1]:
+            return False
+        return all(tree1.lmds[li + k] - li == tree2.lmds[lj + k] - lj for k in range(i - li + 1))
 
     @classmethod
-    def __compute_ast_size(cls, tree):
+    def __distance(cls, tree1, tree2) -> np.float64:
         """
-        Computes the size of the AST tree.
+        Zhang-Shasha tree edit distance on postorder arrays, pairs of identical subtrees are not computed.
+        Costs are unit as zss.simple_distance, where a node of empty label is inserted or removed for free.
         """
-        if tree is None:
-            return 0
-        size = 1  # count the current node
-        for child in tree.children:
-            size += cls.__compute_ast_size(child)
-        return size
+        labels1, lmds1, keyroots1 = tree1.kinds, tree1.lmds, tree1.keyroots
+        labels2, lmds2, keyroots2 = tree2.kinds, tree2.lmds, tree2.keyroots
+        # Identical trees
+        if tree1.hashes[-1] == tree2.hashes[-1] and labels1 == labels2 and lmds1 == lmds2:
+            return np.float64(0)
+        empty = FlatTree.kind_id('')
+        costs1 = [int(label != empty) for label in labels1]
+        costs2 = [int(label != empty) for label in labels2]
+        # Edit cost of each subtree, the nodes of non empty label
+        prefix1 = [0]
+        for cost in costs1: prefix1.append(prefix1[-1] + cost)
+        prefix2 = [0]
+        for cost in costs2: prefix2.append(prefix2[-1] + cost)
+        treedists = [[0] * len(labels2) for _ in labels1]
+        for i in keyroots1:
+            li = lmds1[i]
+            ioff = li - 1
+            m = i - li + 2
+            for j in keyroots2:
+                lj = lmds2[j]
+                joff = lj - 1
+                n = j - lj + 2
+                if tree1.hashes[i] == tree2.hashes[j] and \
+                    cls.__is_same(tree1, i, tree2, j):
+                    # Subtrees on the leftmost paths of identical subtrees are nested,
+                    # their distance is the cost to delete the outer one down to the inner one
+                    path2 = [yj for yj in range(lj, j + 1) if lmds2[yj] == lj]
+                    for xi in range(li, i + 1):
+                        if lmds1[xi] != li: continue
+                        size1 = prefix1[xi + 1] - prefix1[li]
+                        dists = treedists[xi]
+                        for yj in path2:
+                            dists[yj] = abs(size1 - (prefix2[yj + 1] - prefix2[lj]))
+                    continue
+                first = [0]
+                for y in range(1, n):
+                    first.append(first[-1] + costs2[y + joff])
+                fd = [first]
+                for x in range(1, m):
+                    xi = x + ioff
+                    lx = lmds1[xi]
+                    label1 = labels1[xi]
+                    cost1 = costs1[xi]
+                    prev = fd[x - 1]
+                    row = [prev[0] + cost1]
+                    dists = treedists[xi]
+                    on_path1 = lx == li
+                    for y in range(1, n):
+                        yj = y + joff
+                        ly = lmds2[yj]
+                        if on_path1 and ly == lj:
+                            d = min(prev[y] + cost1, row[y - 1] + costs2[yj], 
+                                    prev[y - 1] + (label1 != labels2[yj]))
+                            dists[yj] = d
+                        else:
+                            d = min(prev[y] + cost1, row[y - 1] + costs2[yj], 
+                                    fd[lx - 1 - ioff][ly - 1 - joff] + dists[yj])
+                        row.append(d)
+                    fd.append(row)
+        return np.float64(treedists[-1][-1])
     
     @classmethod
     def relative_patch_size(cls, buggy, patch):
         buggy_tree = cls._ast_to_tree(buggy)
         patch_tree = cls._ast_to_tree(patch)
-        ted = simple_distance(buggy_tree, patch_tree)
+        ted = cls.__distance(buggy_tree, patch_tree)
         buggy_size = cls.__compute_ast_size(buggy_tree)
         return round(ted / buggy_size, 2)
     
+    @classmethod
+    def __histogram(cls, code) -> Counter:
+        # Labels of the nodes which cost an edit
+        def histogram():
+            tree = cls._ast_to_tree(code)
+            histogram = Counter(tree.kinds)
+            del histogram[FlatTree.kind_id('')]
+            return histogram
+        return CodeCache.get('ted_histogram', code, histogram)
+
+    @classmethod
+    def __postorder_cfs(cls, code) -> list:
+        # Control flow labels in postorder, which edit mappings preserve unlike get_cfs
+        def postorder_cfs():
+            tree = cls._ast_to_tree(code)
+            names = {kind.__name__ for kind in CFS_KINDS}
+            return [tree.name(i) for i in range(len(tree)) if tree.name(i) in names]
+        return CodeCache.get('ted_postorder_cfs', code, postorder_cfs)
+
+    @classmethod
+    def lower_bound(cls, code1, code2) -> int:
+        """
+        Lower bound of the tree edit distance from the sizes, label histograms
+        and control flow structures of the two pieces of code.
+        """
+        hist1 = cls.__histogram(code1)
+        hist2 = cls.__histogram(code2)
+        size = abs(hist1.total() - hist2.total())
+        # A rename fixes at most two labels
+        labels = ((hist1 - hist2).total() + (hist2 - hist1).total() + 1) // 2
+        cfs = Levenshtein.distance(cls.__postorder_cfs(code1), cls.__postorder_cfs(code2))
+        return max(size, labels, cfs)
+
+    @classmethod
+    def relative_patch_sizes(cls, buggy, patches:list) -> dict:
+        """
+        Relative patch sizes of the patches which could be the smallest, 
+        patches whose lower bound can not beat the best one are skipped.
+        Returns index of patch -> relative patch size, its minimum is the one of all patches.
+        """
+        buggy_size = cls.__compute_ast_size(cls._ast_to_tree(buggy))
+        bounds = {}
+        for patch in patches:
+            if patch not in bounds:
+                bounds[patch] = round(np.float64(cls.lower_bound(buggy, patch)) / buggy_size, 2)
+        best = None
+        sizes = {}
+        for patch in sorted(bounds, key=bounds.get):
+            if best is not None and bounds[patch] >= best: break
+            sizes[patch] = cls.relative_patch_size(buggy, patch)
+            if best is None or sizes[patch] < best:
+                best = sizes[patch]
+        return {i:sizes[patch] for i, patch in enumerate(patches) if patch in sizes}
+
     @classmethod
     def compute_ted(cls, code1, code2):
         """
@@ -60,7 +166,7 @@ class TED:
         """
         tree1 = cls._ast_to_tree(code1)
         tree2 = cls._ast_to_tree(code2)
-        return simple_distance(tree1, tree2)
+        return cls.__distance(tree1, tree2)
 
     @classmethod
     def compute_sim(cls, code1, code2):
@@ -69,31 +175,18 @@ class TED:
         """
         tree1 = cls._ast_to_tree(code1)
         tree2 = cls._ast_to_tree(code2)
-        distance = simple_distance(tree1, tree2)
+        distance = cls.__distance(tree1, tree2)
         max_distance = cls.__compute_ast_size(tree1) + cls.__compute_ast_size(tree2)
         similarity = 1 - distance / max_distance
         return similarity
     
     @classmethod
-    @cache
     def get_cfs(cls, code):
         """
         Extracts the control flow structure from the code.
         """
-        tree = ast.parse(code)
-        cfs = []
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.For, 
-                                 ast.While,
-                                 ast.If, 
-                                 ast.Try, 
-                                 ast.With,
-                                 ast.FunctionDef,
-                                 ast.AsyncFunctionDef,
-                                 ast.ClassDef)):
-                cfs.append(node.__class__.__name__)
-        return cfs
-    
+        return CodeCache.get('ted_cfs', code, lambda: CodeCache.flat_tree(code).cfs())
+
     @classmethod
     def compute_cfs(cls, code1, code2):
         """
@@ -0,0 +1,103 @@
+import pytest
+
+from src.utils import BoundedRepr, Truncated, Snapshot
+
+LIMIT = 1000
+
+
+def values():
+    yield list(range(150))
+    yield [[i, i + 1, i + 2] for i in range(60)]
+    yield list('abcdefghij' * 12)
+    yield {i:i for i in range(120)}
+    yield {i:[str(i), (i,), {i}] for i in range(40)}
+    yield tuple(range(200))
+    yield set(range(200))
+    yield frozenset(range(150))
+    yield [[[[[[[[1]]]]]]]] * 20
+    yield [b'ab', None, 1.5, True, 'it\'s', (1,), (), set(), frozenset(), {}]
+
+
+def sized(container, size:int):
+    # Container of 100 ints and a string whose str() is exactly size long
+    items = list(range(100))
+    pad = size - len(str(container(items + [''])))
+    return container(items + ['a' * pad])
+
+
+@pytest.mark.parametrize('value', list(values()))
+def test_same_as_str(value):
+    assert len(str(value)) <= LIMIT
+    assert BoundedRepr(LIMIT).run(value) == str(value)
+
+
+@pytest.mark.parametrize('container', [list, tuple, set, frozenset])
+def test_limit(container):
+    under = sized(container, LIMIT)
+    assert len(str(under)) == LIMIT
+    assert BoundedRepr(LIMIT).run(under) == str(under)
+    over = sized(container, LIMIT + 1)
+    assert len(str(over)) == LIMIT + 1
+    result = BoundedRepr(LIMIT).run(over)
+    assert isinstance(result, Truncated)
+    assert str(over).startswith(result.text)
+
+
+def test_dict_limit():
+    value = {i:i for i in range(100)}
+    value['a'] = 'a' * (LIMIT - len(str(value)) - len(", 'a': ''"))
+    assert len(str(value)) == LIMIT
+    assert BoundedRepr(LIMIT).run(value) == str(value)
+    value['a'] += 'a'
+    assert isinstance(BoundedRepr(LIMIT).run(value), Truncated)
+
+
+def test_recursive():
+    value = [1, 2]
+    value.append(value)
+    assert BoundedRepr(LIMIT).run(value) == str(value)
+
+
+def test_large_leaves():
+    assert isinstance(BoundedRepr(LIMIT).run(['a' * LIMIT]), Truncated)
+    assert isinstance(BoundedRepr(LIMIT).run([10 ** 5000]), Truncated)
+    assert isinstance(BoundedRepr(LIMIT).run(10 ** 5000), Truncated)
+    assert BoundedRepr(LIMIT).run('a' * LIMIT) == 'a' * LIMIT
+
+
+def test_recursive_snapshot():
+    value = [3]
+    value.append(value)
+    value.append(1)
+    snapshot = Snapshot.take(value, BoundedRepr(LIMIT).run(value))
+    assert snapshot.text == str(value)
+    assert snapshot.key == ('list', (3, ('recursive', 'list'), 1))
+    other = {'a': 1}
+    other['b'] = other
+    snapshot = Snapshot.take(other, BoundedRepr(LIMIT).run(other))
+    assert snapshot.text == str(other)
+    same = {'a': 1}
+    same['b'] = same
+    assert snapshot == Snapshot.take(same, BoundedRepr(LIMIT).run(same))
+
+
+def test_deep_snapshot():
+    # Containers nested past MAX_DEPTH are a marker, not a recursion error
+    from src.utils.boundedRepr import MAX_DEPTH
+    def nested(depth:int, leaf):
+        value = [leaf]
+        for _ in range(depth - 1):
+            value = [value]
+        return value
+    value = nested(10000, 1)
+    text = BoundedRepr(3 * 10000).run(value)
+    assert text == '[' * 10000 + '1' + ']' * 10000
+    snapshot = Snapshot.take(value, text)
+    key = snapshot.key
+    for _ in range(MAX_DEPTH + 1):
+        key = key[1][0]
+    assert key == ('truncated', 'list')
+    assert snapshot == Snapshot.take(nested(10000, 1), text)
+    assert hash(snapshot) == hash(Snapshot.take(nested(10000, 1), text))
+    # Values which differ above the cut are not equal
+    assert snapshot != Snapshot.take(nested(MAX_DEPTH, 2), str(nested(MAX_DEPTH, 2)))
@@ -0,0 +1,35 @@
+import ast
+import pytest
+
+import src.utils
+from src.utils import CodeCache
+
+PROGRAMS = [f'x = {i}\ny = x + {i}\n' for i in range(10)]
+
+
+@pytest.fixture
+def code_cache(monkeypatch):
+    monkeypatch.setattr(CodeCache, 'max_size', 4)
+    CodeCache.init_cache()
+    yield
+    CodeCache.init_cache()
+
+
+def test_bounded_stages(code_cache):
+    # Each stage keeps its most recently used programs only
+    for _ in range(2):
+        for code in PROGRAMS:
+            assert ast.dump(CodeCache.parse(code)) == ast.dump(ast.parse(code))
+            assert CodeCache.regularize(code) == ast.unparse(ast.parse(code))
+    stats = CodeCache.stats()
+    assert stats['parse'] == {'size': 4, 'hits': 0, 'misses': 20, 'hit_rate': 0}
+    assert CodeCache.parse(PROGRAMS[-1]) is CodeCache.parse(PROGRAMS[-1])
+    assert CodeCache.stats()['parse']['hits'] == 2
+
+
+def test_compile(code_cache):
+    namespace = {}
+    exec(CodeCache.compile(PROGRAMS[3]), namespace)
+    assert namespace['y'] == 6
+    assert CodeCache.compile(PROGRAMS[3]) is CodeCache.compile(PROGRAMS[3])
+    assert CodeCache.compile(PROGRAMS[3], 'other') is not CodeCache.compile(PROGRAMS[3])
@@ -0,0 +1,48 @@
+import pickle
+import random
+import pytest
+
+import src.utils
+from src.execution import ExecTrace
+
+
+def traces():
+    rng = random.Random(0)
+    yield []
+    yield [3]
+    yield [1, 2, 2, 2, 2, 3]
+    # Loops of loops, with a few irregular iterations
+    for _ in range(50):
+        trace = [1]
+        for _ in range(rng.randint(0, 6)):
+            body = [rng.randint(2, 9) for _ in range(rng.randint(1, 5))]
+            for _ in range(rng.randint(1, 80)):
+                trace += body
+                if rng.random() < 0.05:
+                    trace.append(rng.randint(2, 9))
+        yield trace
+    yield [rng.randint(1, 40) for _ in range(1000)]
+
+
+@pytest.mark.parametrize('chunk_size', [ExecTrace.chunk_size, 7])
+@pytest.mark.parametrize('trace', list(traces()))
+def test_exec_trace(monkeypatch, trace, chunk_size):
+    # A compressed trace reads back as the list of executed lines
+    monkeypatch.setattr(ExecTrace, 'chunk_size', chunk_size)
+    exec_traces = ExecTrace()
+    for lineno in trace:
+        exec_traces.append(lineno)
+    assert list(exec_traces) == trace
+    assert len(exec_traces) == len(trace)
+    assert exec_traces == trace
+    assert exec_traces.first_seen() == list(dict.fromkeys(trace))
+    assert exec_traces.lines() == set(trace)
+    assert ExecTrace(trace) == exec_traces
+    assert pickle.loads(pickle.dumps(exec_traces)) == trace
+
+
+def test_loop_compressed():
+    # Iterations of a loop body are kept once
+    exec_traces = ExecTrace([1] + [2, 3, 4] * 1000 + [5])
+    assert sum(len(segment) for segment, _ in exec_traces.runs()) < 2 * ExecTrace.chunk_size
+    assert len(exec_traces) == 3002
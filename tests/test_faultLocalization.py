@@ -0,0 +1,156 @@
+import random
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+import src.utils
+from src.utils import Snapshot
+from src.execution import Tester, ExecTrace, FaultLocalization, UnitTestStatus
+
+STATUSES = [UnitTestStatus.success, UnitTestStatus.failure, UnitTestStatus.error]
+
+
+def baseline_trantula(test_hist:dict, trace_hist:dict) -> dict:
+    # Former FaultLocalization.trantula on dicts of counts
+    total_pass, total_fail = 0, 0
+    pass_cnt_dict, fail_cnt_dict = {}, {}
+    lines = set()
+    for no, status in test_hist.items():
+        for lineno in set(trace_hist[no]):
+            lines.add(lineno)
+            if not Tester.is_pass(status):
+                total_fail += 1
+                fail_cnt_dict[lineno] = fail_cnt_dict.get(lineno, 0) + 1
+            else:
+                total_pass += 1
+                pass_cnt_dict[lineno] = pass_cnt_dict.get(lineno, 0) + 1
+    suspiciousness = {}
+    for lineno in lines:
+        pass_cnt = pass_cnt_dict.get(lineno, 0)
+        fail_cnt = fail_cnt_dict.get(lineno, 0)
+        score = 0
+        try: score = round((fail_cnt / total_fail) / ((fail_cnt / total_fail) + (pass_cnt / total_pass)), 1)
+        except ZeroDivisionError:
+            if fail_cnt > 0 and pass_cnt == 0:
+                score = 1
+        suspiciousness[lineno] = score
+    return suspiciousness
+
+
+def baseline_jaccard(test_hist:dict, trace_hist:dict) -> dict:
+    # Former FaultLocalization.jaccard on dicts of counts
+    total_fail = 0
+    exec_cnt_dict, fail_cnt_dict = {}, {}
+    lines = set()
+    for no, status in test_hist.items():
+        if not Tester.is_pass(status):
+            total_fail += 1
+        for lineno in set(trace_hist[no]):
+            lines.add(lineno)
+            exec_cnt_dict[lineno] = exec_cnt_dict.get(lineno, 0) + 1
+            if not Tester.is_pass(status):
+                fail_cnt_dict[lineno] = fail_cnt_dict.get(lineno, 0) + 1
+    suspiciousness = {}
+    for lineno in lines:
+        exec_cnt = exec_cnt_dict.get(lineno, 0)
+        fail_cnt = fail_cnt_dict.get(lineno, 0)
+        suspiciousness[lineno] = round((fail_cnt / (exec_cnt + (total_fail - fail_cnt))), 1)
+    return suspiciousness
+
+
+def baseline_vsusfl(test_hist1:dict, vari_hist1:dict, trace_hist1:dict,
+                    test_hist2:dict, vari_hist2:dict, var_map:dict) -> dict:
+    # Former FaultLocalization.vsusfl, lines of var2 are searched for every var1
+    suspiciousness = {}
+    var_map = {v:k for k, v in var_map.items()}
+    for tc_id, status1 in test_hist1.items():
+        status2 = test_hist2[tc_id]
+        vvs1 = vari_hist1[tc_id]
+        vvs1_line_var_map = {}
+        for var, values in vvs1.items():
+            for data in values:
+                vvs1_line_var_map.setdefault(data[1], set()).add(var)
+        vvs2 = vari_hist2[tc_id]
+        vvs2_line_var_map = {}
+        for var2, values in vvs2.items():
+            for data in values:
+                vvs2_line_var_map.setdefault(data[1], {}).setdefault(var2, []).append(data[0])
+        for lineno in trace_hist1[tc_id]:
+            suspiciousness.setdefault(lineno, 0)
+            if lineno not in vvs1_line_var_map: continue
+            for var1 in vvs1_line_var_map[lineno]:
+                if var1 not in var_map or var1 not in vvs1:
+                    if not Tester.is_pass(status1):
+                        suspiciousness[lineno] += 9
+                    continue
+                found = False
+                var2 = var_map[var1]
+                if var2 not in vvs2: continue
+                values1 = [item[0] for item in vvs1[var1] if item[1] == lineno]
+                for lineno2, var_value_dict2 in vvs2_line_var_map.items():
+                    if var2 not in var_value_dict2: continue
+                    if values1 == var_value_dict2[var2]:
+                        del vvs2_line_var_map[lineno2][var2]
+                        found = True
+                        break
+                if found:
+                    if Tester.is_pass(status1) and Tester.is_pass(status2):
+                        suspiciousness[lineno] += 1
+                elif not Tester.is_pass(status1) and Tester.is_pass(status2):
+                    suspiciousness[lineno] += 9
+    if suspiciousness:
+        scaler = MinMaxScaler((0.3, 1.0))
+        scaler.fit([[value] for value in suspiciousness.values()])
+        suspiciousness = {key: float(scaled_value[0]) for key, scaled_value in
+                          zip(suspiciousness.keys(), scaler.transform([[value] for value in suspiciousness.values()]))}
+    return suspiciousness
+
+
+def runs(rng:random.Random, n_lines:int=10):
+    # Statuses and traces of a few testcases, sometimes all passed or all failed
+    tc_ids = list(range(1, rng.randint(1, 6) + 1))
+    statuses = rng.choice([STATUSES, STATUSES[:1], STATUSES[1:]])
+    test_hist = {tc_id: rng.choice(statuses) for tc_id in tc_ids}
+    trace_hist = {tc_id: ExecTrace(rng.randint(1, n_lines) for _ in range(rng.randint(0, 30)))
+                  for tc_id in tc_ids}
+    return test_hist, trace_hist
+
+
+def spectra():
+    rng = random.Random(0)
+    for _ in range(200):
+        yield runs(rng)
+
+
+@pytest.mark.parametrize('test_hist, trace_hist', list(spectra()))
+def test_sbfl(test_hist, trace_hist):
+    # Coverage matrix formulas give the scores of the former counting loops
+    fl = FaultLocalization()
+    assert fl.run_core(test_hist, trace_hist, 'trantula') == baseline_trantula(test_hist, trace_hist)
+    assert fl.run_core(test_hist, trace_hist, 'jaccard') == baseline_jaccard(test_hist, trace_hist)
+
+
+def variable_runs():
+    rng = random.Random(1)
+    values = [Snapshot.take(value, str(value)) for value in [0, 1, 2, 'a', [1], (1,)]]
+    for _ in range(200):
+        test_hist1, trace_hist1 = runs(rng, 6)
+        test_hist2 = {tc_id: rng.choice(STATUSES) for tc_id in test_hist1}
+        def vari_hist(var_names, trace_hist):
+            # Values recorded on the executed lines, few values give many equal histories
+            return {tc_id: {var: [(rng.choice(values), lineno)
+                                  for lineno in trace if rng.random() < 0.3]
+                            for var in var_names if rng.random() < 0.9}
+                    for tc_id, trace in trace_hist.items()}
+        vari_hist1 = vari_hist(['a', 'b', 'c'], trace_hist1)
+        vari_hist2 = vari_hist(['x', 'y', 'z'], trace_hist1)
+        var_map = {var2: var1 for var2, var1 in zip(['x', 'y', 'z'], rng.sample(['a', 'b', 'c', 'd'], 3))
+                   if rng.random() < 0.8}
+        yield test_hist1, vari_hist1, trace_hist1, test_hist2, vari_hist2, var_map
+
+
+@pytest.mark.parametrize('test_hist1, vari_hist1, trace_hist1, test_hist2, vari_hist2, var_map', list(variable_runs()))
+def test_vsusfl(test_hist1, vari_hist1, trace_hist1, test_hist2, vari_hist2, var_map):
+    # Lines of var2 indexed by their values are matched as by the former search
+    expected = baseline_vsusfl(test_hist1, vari_hist1, trace_hist1, test_hist2, vari_hist2, var_map)
+    assert FaultLocalization().vsusfl(test_hist1, vari_hist1, trace_hist1,
+                                      test_hist2, vari_hist2, {}, var_map) == expected
@@ -0,0 +1,72 @@
+import itertools
+import pytest
+
+import src.utils
+from src.utils import divide
+from src.execution import Tester
+from src.transform import NodeParser
+from src.genetic import Fitness, FitnessCache
+
+TESTCASES = [{'no': i, 'input': f'f({x})', 'output': str(abs(x) * 2)}
+             for i, x in enumerate([3, -2, 0, 5], 1)]
+PROGRAMS = [
+    'def f(x):\n    return abs(x) * 2\n',
+    'def f(x):\n    return x + x\n',
+    'def f(x):\n    if x < 0: x = -x\n    return x * 2\n',
+    'def f(x):\n    y = 0\n    for i in range(abs(x)):\n        y += 2\n    return y\n',
+    'def f(x):\n    y = 0\n    while x > 0:\n        y += 2; x -= 1\n    return y\n',
+    'def g(x):\n    return -x if x < 0 else x\n\ndef f(x):\n    return g(x) * 2\n',
+    'def f(x):\n    return [x][1]\n',
+]
+
+
+def baseline_trace_sim(w_code:str, r_code:str, w_trace:list, r_trace:list) -> float:
+    # Former NodeMap.trace_sim, mapped nodes of the DP table backtrack
+    def trace_node_map(code, trace):
+        node_parser = NodeParser()
+        node_parser.run(code)
+        line_node_map = node_parser.line_node_map
+        return {line_node_map[lineno]:line_node_map[lineno].__class__.__name__
+                for lineno in trace if lineno in line_node_map}
+    a = list(reversed(trace_node_map(w_code, w_trace).values()))
+    b = list(reversed(trace_node_map(r_code, r_trace).values()))
+    dp = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            dp[i][j] = dp[i - 1][j - 1] + 1 if a[i - 1] == b[j - 1] else max(dp[i - 1][j], dp[i][j - 1])
+    return divide(dp[len(a)][len(b)], max(len(w_trace), len(r_trace)))
+
+
+def baseline_fitness(w_code:str, r_code:str) -> dict:
+    # Former Fitness.run
+    w_test_hist, _, w_trace_hist = Tester.trace(w_code)
+    w_pass, w_fail = Tester.split_test_hist(w_test_hist)
+    r_test_hist, _, r_trace_hist = Tester.trace(r_code)
+    r_pass, _ = Tester.split_test_hist(r_test_hist)
+    fp = set(w_fail) & set(r_pass)
+    pp = set(w_pass) & set(r_pass)
+    fp_trace, pp_trace = 0, 0
+    for testcase in Tester.testsuite:
+        if testcase.no not in fp and testcase.no not in pp:
+            continue
+        trace_sim = baseline_trace_sim(w_code, r_code,
+                                       list(w_trace_hist[testcase.no]),
+                                       list(r_trace_hist[testcase.no]))
+        if testcase.no in fp: fp_trace += trace_sim
+        elif testcase.no in pp: pp_trace += trace_sim
+    return {'fp_test': divide(len(fp), len(w_fail)), 'pp_test': divide(len(pp), len(w_pass)),
+            'fp_trace': divide(fp_trace, len(fp)), 'pp_trace': divide(pp_trace, len(pp))}
+
+
+@pytest.fixture(scope='module')
+def tester():
+    Tester.init_global_data(TESTCASES, timeout=0.5)
+    FitnessCache.init_global_data()
+    yield
+    Tester.shutdown()
+
+
+@pytest.mark.parametrize('w_code, r_code', list(itertools.product(PROGRAMS, repeat=2)))
+def test_profile_fitness(tester, w_code, r_code):
+    # Scores of pairs of profiles are those of the former pairwise fitness
+    assert Fitness.compute(w_code, r_code) == baseline_fitness(w_code, r_code)
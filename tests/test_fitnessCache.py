@@ -0,0 +1,52 @@
+import itertools
+import pytest
+
+import src.utils
+from src.execution import Tester
+from src.genetic import Fitness, FitnessCache
+
+TESTCASES = [{'no': i, 'input': f'f({x})', 'output': str(abs(x) * 2)}
+             for i, x in enumerate([3, -2, 0], 1)]
+PROGRAMS = [
+    'def f(x):\n    return abs(x) * 2\n',
+    'def f(x):\n    return x + x\n',
+    'def f(x):\n    if x < 0: x = -x\n    return x * 2\n',
+]
+PAIRS = list(itertools.product(PROGRAMS, repeat=2))
+
+
+@pytest.fixture
+def tester(monkeypatch):
+    monkeypatch.setattr(FitnessCache, 'max_size', FitnessCache.max_size)
+    Tester.init_global_data(TESTCASES, timeout=0.5)
+    FitnessCache.init_global_data()
+    yield
+    FitnessCache.clear()
+    Tester.shutdown()
+
+
+def test_bounded(tester):
+    # Scores evicted from a small cache are computed again to the same values
+    expected = {pair: Fitness.compute(*pair) for pair in PAIRS}
+    FitnessCache.init_global_data(4)
+    for _ in range(2):
+        for pair in PAIRS:
+            assert Fitness.run(*pair) == expected[pair]
+            assert len(FitnessCache.scores) <= 4
+    stats = FitnessCache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (0, 2 * len(PAIRS), 2 * len(PAIRS) - 4)
+    assert Fitness.run(*PAIRS[-1]) == expected[PAIRS[-1]]
+    assert FitnessCache.stats()['hits'] == 1
+
+
+def test_disk_shared(tmp_path, monkeypatch):
+    # Another process reads the scores from the disk cache of Tester
+    Tester.init_global_data(TESTCASES, timeout=0.5, cache_dir=str(tmp_path))
+    FitnessCache.init_global_data()
+    expected = [Fitness.run(*pair) for pair in PAIRS]
+    FitnessCache.clear()
+    def not_computed(*args):
+        raise AssertionError("score was computed")
+    monkeypatch.setattr(Fitness, 'compute', not_computed)
+    assert [Fitness.run(*pair) for pair in PAIRS] == expected
+    assert FitnessCache.stats()['disk_hits'] == len(PAIRS)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from src.utils import Randoms
+from src.execution import Tester
+from src.genetic import FitnessCache, FitnessMatrix, Selection
+
+TESTCASES = [{'no': i, 'input': f'f({i})', 'output': str(i * 2)} for i in range(1, 4)]
+
+POPULATION = {
+    'a': 'def f(x):\n    return x + x\n',
+    'b': 'def f(x):\n    return x * 3\n',
+    'c': 'def f(x):\n    y = x\n    return y + 1\n',
+    'd': 'def f(x):\n    if x > 1:\n        return x * 2\n    return x\n',
+}
+CORRECTS = {'a': POPULATION['a']}
+WRONGS = {p_id: code for p_id, code in POPULATION.items() if p_id not in CORRECTS}
+
+
+@pytest.fixture
+def serial_matrix():
+    Tester.init_global_data(TESTCASES)
+    FitnessCache.init_global_data()
+    FitnessMatrix.init_global_data()
+    yield FitnessMatrix.run(list(WRONGS.values()), POPULATION)
+    Tester.shutdown()
+
+
+def test_pools_in_pool(tmp_path, serial_matrix):
+    # Fitness workers are forked from a parent which already has a Tester pool and disk cache
+    Tester.init_global_data(TESTCASES, backend='pool', workers=2, cache_dir=str(tmp_path))
+    FitnessCache.init_global_data()
+    FitnessMatrix.init_global_data(2)
+    try:
+        matrix, valid = FitnessMatrix.run(list(WRONGS.values()), POPULATION)
+        Randoms.seed = 0
+        selected = Selection(WRONGS, CORRECTS).run(POPULATION, len(POPULATION))
+        # Parent handles are still usable after the workers set up their own
+        assert Tester.is_all_pass(Tester.validation(POPULATION['a']))
+    finally:
+        Randoms.seed = None
+        FitnessMatrix.shutdown()
+        Tester.shutdown()
+    assert np.array_equal(matrix, serial_matrix[0])
+    assert np.array_equal(valid, serial_matrix[1])
+    assert set(selected) == set(WRONGS)
+    assert set(selected.values()) <= set(POPULATION)
@@ -0,0 +1,74 @@
+import ast
+import random
+import pytest
+
+import src.utils
+from src.utils import FlatTree, LCS, TED, CodeCache, divide
+from src.execution import ExecTrace
+from src.transform import NodeParser, NodeMap
+
+PROGRAMS = [
+    'x = 1\n',
+    'x = 1; y = 2\nif x: y = 3\n',
+    'def f(x):\n    if x < 0: x = -x\n    return x * 2\n',
+    'def f(xs):\n    s = 0\n    for x in xs:\n        while s < x: s += 1\n    return s\n',
+    'def f(a):\n    try:\n        return 1 / a\n    except ZeroDivisionError:\n        return None\n    finally:\n        a = 0\n',
+    'class C:\n    a = 1\n    def f(self):\n        def g(): return self.a\n        return g()\n',
+    'def f(xs):\n    return [x for x in xs if x]\n\nwith open("f") as g: h = g.read()\n',
+]
+
+
+@pytest.mark.parametrize('code', PROGRAMS)
+def test_line_node_map(code):
+    # Same statement of each line as NodeParser, the last one in preorder
+    tree = ast.parse(code)
+    node_parser = NodeParser()
+    node_parser.run(tree=tree)
+    line_node_map = FlatTree(tree).line_node_map
+    assert list(line_node_map) == list(node_parser.line_node_map)
+    assert all(line_node_map[lineno] is node for lineno, node in node_parser.line_node_map.items())
+
+
+@pytest.mark.parametrize('code', PROGRAMS)
+def test_walk(code):
+    tree = ast.parse(code)
+    flat_tree = FlatTree(tree)
+    assert [flat_tree.nodes[i] for i in flat_tree.walk()] == list(ast.walk(tree))
+    assert [flat_tree.name(i) for i in flat_tree.walk()] == [type(node).__name__ for node in ast.walk(tree)]
+
+
+def baseline_trace_sim(a_code:str, b_code:str, a_trace:list, b_trace:list) -> float:
+    # Former NodeMap.trace_sim on the line node maps of NodeParser
+    def names(code, trace):
+        node_parser = NodeParser()
+        node_parser.run(code)
+        line_node_map = node_parser.line_node_map
+        return list({line_node_map[lineno]:line_node_map[lineno].__class__.__name__
+                     for lineno in trace if lineno in line_node_map}.values())
+    lcs = LCS.length(names(a_code, a_trace)[::-1], names(b_code, b_trace)[::-1])
+    return divide(lcs, max(len(a_trace), len(b_trace)))
+
+
+def test_trace_sim():
+    rng = random.Random(0)
+    for a_code in PROGRAMS:
+        for b_code in PROGRAMS:
+            a_trace = [rng.randint(1, 8) for _ in range(rng.randint(1, 20))]
+            b_trace = [rng.randint(1, 8) for _ in range(rng.randint(1, 20))]
+            node_map = NodeMap(a_code, b_code)
+            assert node_map.trace_sim(ExecTrace(a_trace), ExecTrace(b_trace)) == \
+                baseline_trace_sim(a_code, b_code, a_trace, b_trace)
+
+
+@pytest.mark.parametrize('init_cache', [CodeCache.init_cache, TED.init_cache])
+def test_labels_reset(init_cache):
+    # Labels only hold those of the trees built since the cache was reset
+    init_cache()
+    distances = [TED.compute_ted(a_code, b_code) for a_code in PROGRAMS for b_code in PROGRAMS]
+    names = list(FlatTree.names)
+    TED.compute_ted('import os\nprint(os.sep)\n', 'x = "other label"\n')
+    assert len(FlatTree.names) > len(names)
+    init_cache()
+    assert FlatTree.labels == {} and FlatTree.names == []
+    assert [TED.compute_ted(a_code, b_code) for a_code in PROGRAMS for b_code in PROGRAMS] == distances
+    assert FlatTree.names == names
@@ -0,0 +1,63 @@
+import random
+import pytest
+
+import src.utils
+from src.utils import LCS
+
+
+def baseline_lcs(a:list, b:list) -> tuple[int, list]:
+    # Former DP table of NodeMap.rep_node_map and VariableMap.lcs, and its backtrack
+    dp = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            if a[i - 1] == b[j - 1]:
+                dp[i][j] = dp[i - 1][j - 1] + 1
+            else:
+                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
+    pairs = []
+    i, j = len(a), len(b)
+    while i > 0 and j > 0:
+        if a[i - 1] == b[j - 1]:
+            pairs.append((i - 1, j - 1))
+            i -= 1
+            j -= 1
+        elif dp[i - 1][j] > dp[i][j - 1]:
+            i -= 1
+        else:
+            j -= 1
+    return dp[len(a)][len(b)], pairs
+
+
+def sequences():
+    rng = random.Random(0)
+    yield [], []
+    yield ['If'], []
+    yield ['If', 'Return'], ['If', 'Return']
+    yield ['Assign'] * 5, ['Assign'] * 3
+    for _ in range(200):
+        # Few symbols give many ties in the table
+        symbols = rng.choice([['If', 'For', 'Assign'], list(range(8)), [1, 1.0, True, 2]])
+        a = [rng.choice(symbols) for _ in range(rng.randint(0, 40))]
+        b = [rng.choice(symbols) for _ in range(rng.randint(0, 40))]
+        yield a, b
+    # Longer than a machine word
+    yield [rng.randint(0, 3) for _ in range(300)], [rng.randint(0, 3) for _ in range(200)]
+
+
+@pytest.mark.parametrize('a, b', list(sequences()))
+def test_lcs(a, b):
+    length, pairs = baseline_lcs(a, b)
+    assert LCS.length(a, b) == length
+    assert LCS.traceback(a, b) == pairs
+
+
+def test_lcs_unhashable():
+    # Recorded variable values may be lists or dicts
+    rng = random.Random(1)
+    values = [[1], [1, 2], {'a': 1}, [], 3, None]
+    for _ in range(100):
+        a = [rng.choice(values) for _ in range(rng.randint(0, 20))]
+        b = [rng.choice(values) for _ in range(rng.randint(0, 20))]
+        length, pairs = baseline_lcs(a, b)
+        assert LCS.length(a, b) == length
+        assert LCS.traceback(a, b) == pairs
@@ -0,0 +1,56 @@
+import ast
+import re
+import pytest
+
+import src.utils
+from src.utils import Regularize, CodeCache
+
+PROGRAMS = [
+    'x = 1\n',
+    '# comment\nx = 1  # trailing\n\n\ny = 2\n',
+    'def f(x):\n    """Docstring."""\n    return x\n',
+    "def f(x):\n    '''Multi\n    line\n    docstring'''\n    # comment\n    return x\n",
+    'class C:\n    "Doc"\n    a = 1\n    def f(self):\n        "doc"\n        return "text"\n',
+    'def f(x):\n    s = "a # not a comment"\n    return s + \'b\'\n',
+    'x = 1\n"string used as comment"\nif x:\n    y = 2\n    "note"\nelse:\n    y = 3\n',
+    'def f(xs):\n    for x in xs:\n        if x:  # odd\n            continue\n    return [x for x in xs]\n',
+]
+
+
+def baseline_regularize(code:str) -> str:
+    # Former Regularize.run, regexes between two unparses
+    code = ast.unparse(ast.parse(code))
+    code = re.sub(r'(?m)^\s*(#.*|\'[^\']*\'|"[^"]*")\s*$', '', code)
+    code = re.sub(r'(?s)(\'\'\'.*?\'\'\')|(""".*?""")', '', code)
+    return ast.unparse(ast.parse(code))
+
+
+def stdlib_sources():
+    import bisect, colorsys, heapq, textwrap
+    import inspect
+    for module in [bisect, colorsys, heapq, textwrap]:
+        yield inspect.getsource(module)
+
+
+@pytest.fixture(autouse=True)
+def code_cache():
+    CodeCache.init_cache()
+
+
+@pytest.mark.parametrize('code', PROGRAMS + list(stdlib_sources()))
+def test_regularize(code):
+    assert Regularize.run(code) == baseline_regularize(code)
+
+
+@pytest.mark.parametrize('code', PROGRAMS)
+def test_regularized_again(code):
+    # Regularized code is a fixed point, read back from the cache
+    regular_code = Regularize.run(code)
+    assert Regularize.regular(regular_code) == regular_code
+    assert Regularize.run(regular_code) == regular_code
+
+
+def test_string_only_blocks():
+    # Blocks of only strings keep a pass where the regexes left an empty block
+    code = 'def f():\n    """Doc."""\nif True:\n    "a"\nelse:\n    "b"\n'
+    assert Regularize.run(code) == 'def f():\n    pass\nif True:\n    pass'
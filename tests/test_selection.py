@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from paretoset import paretoset
+
+import src.utils
+from src.utils import Randoms
+from src.genetic import Selection
+
+
+def baseline_candidates(scores:dict) -> list:
+    # Candidates of the former per-program NSGA-III, before Randoms.choice
+    scores_df = pd.DataFrame.from_dict(scores, orient='index')
+    pareto_set = paretoset(scores_df, sense=["max", "max", "max", "max"])
+    fronts = scores_df[pareto_set].index.tolist()
+    r_candidates = []
+    for reference_point in Selection.reference_points:
+        reference_direction = reference_point / np.linalg.norm(reference_point)
+        r_distance_dict = {}
+        for r_id in fronts:
+            point = np.array(scores[r_id])
+            projection = np.dot(point, reference_direction) * reference_direction
+            r_distance_dict[r_id] = np.linalg.norm(point - projection)
+        min_distance = min(r_distance_dict.values())
+        r_candidates.extend(r_id for r_id, distance in r_distance_dict.items()
+                            if distance == min_distance)
+    return r_candidates
+
+
+def score_tensors():
+    rng = np.random.default_rng(0)
+    for n_wrongs, n_samples in [(1, 1), (3, 5), (8, 20), (5, 60)]:
+        # Fitness scores are ratios of small counts, so ties and duplicates are common
+        scores = rng.integers(0, 4, size=(n_wrongs, n_samples, 4)) / 3
+        valid = rng.random((n_wrongs, n_samples)) > 0.1
+        valid[:, 0] = True
+        yield scores, valid
+    yield rng.random((4, 30, 4)), np.ones((4, 30), dtype=bool)
+    yield np.zeros((2, 6, 4)), np.ones((2, 6), dtype=bool)
+
+
+@pytest.mark.parametrize('chunk_elements', [Selection.chunk_elements, 64])
+@pytest.mark.parametrize('scores, valid', list(score_tensors()))
+def test_nsga_iii_batch(monkeypatch, scores, valid, chunk_elements):
+    # Same candidates as the former NSGA-III of each wrong program, also over chunks of wrongs
+    n_wrongs, n_samples, _ = scores.shape
+    monkeypatch.setattr(Selection, 'chunk_elements', chunk_elements)
+    samples = {f'r{j}': f'code{j}' for j in range(n_samples)}
+    w_codes = [f'wrong{i}' for i in range(n_wrongs)]
+    selection = Selection({}, {})
+    monkeypatch.setattr(selection, 'fitness_tensor', lambda w_codes, samples: (scores, valid))
+    monkeypatch.setattr(Randoms, 'choice', classmethod(lambda cls, elements: list(elements)))
+    candidates = selection.nsga_iii_batch(w_codes, samples)
+    r_ids = list(samples)
+    for i in range(n_wrongs):
+        expected = baseline_candidates({r_ids[j]: list(scores[i, j])
+                                        for j in range(n_samples) if valid[i, j]})
+        assert candidates[i] == expected
+
+
+# Scores of each sample: duplicated vectors, and permutations at the same distance of a reference
+TIED_SCORES = [
+    [1.0, 0.0, 0.0, 0.0],
+    [0.0, 1.0, 0.0, 0.0],
+    [1.0, 0.0, 0.0, 0.0],
+    [0.0, 0.0, 1.0, 0.0],
+    [1/3, 2/3, 1/3, 2/3],
+    [2/3, 1/3, 2/3, 1/3],
+    [1/3, 2/3, 1/3, 2/3],
+    [0.0, 0.0, 0.0, 1.0],
+    [0.5, 0.5, 0.5, 0.5],
+    [0.5, 0.5, 0.5, 0.5],
+    [0.0, 0.0, 0.0, 0.0],
+]
+
+
+def tied_wrongs():
+    # Every wrong program sees a different subset of the tied samples
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        n_samples = rng.integers(2, len(TIED_SCORES) + 1)
+        yield [TIED_SCORES[j] for j in rng.choice(len(TIED_SCORES), n_samples)]
+
+
+def test_nsga_iii_ties(monkeypatch):
+    # Batched selection picks the candidates of NSGA-III run for each wrong program alone
+    wrongs = list(tied_wrongs())
+    n_samples = max(len(w_scores) for w_scores in wrongs)
+    scores = np.zeros((len(wrongs), n_samples, 4))
+    valid = np.zeros((len(wrongs), n_samples), dtype=bool)
+    for i, w_scores in enumerate(wrongs):
+        scores[i, :len(w_scores)] = w_scores
+        valid[i, :len(w_scores)] = True
+    samples = {f'r{j}': f'code{j}' for j in range(n_samples)}
+    w_codes = [f'wrong{i}' for i in range(len(wrongs))]
+    selection = Selection({}, {})
+    def fitness_tensor(w_codes, samples):
+        rows = [int(w_code[len('wrong'):]) for w_code in w_codes]
+        return scores[rows], valid[rows]
+    monkeypatch.setattr(selection, 'fitness_tensor', fitness_tensor)
+    monkeypatch.setattr(Randoms, 'choice', classmethod(lambda cls, elements: list(elements)))
+    candidates = selection.nsga_iii_batch(w_codes, samples)
+    r_ids = list(samples)
+    for i, w_code in enumerate(w_codes):
+        expected = baseline_candidates({r_ids[j]: scores_j for j, scores_j in enumerate(wrongs[i])})
+        assert selection.nsga_iii(w_code, samples) == expected
+        assert candidates[i] == expected
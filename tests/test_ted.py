@@ -0,0 +1,88 @@
+import ast
+import importlib.util
+import itertools
+import pytest
+
+import src.utils
+from src.utils import TED
+
+PROGRAMS = [
+    'x = 1\n',
+    'y = 1\n',
+    'x = 1\ny = 2\n',
+    'def f(x):\n    return x + x\n',
+    'def f(x):\n    return x * 2\n',
+    'def f(x):\n    return x + x + x\n',
+    'def f(x, y):\n    if x > y:\n        return x\n    return y\n',
+    'def f(x, y):\n    if x > y:\n        return x\n    else:\n        return y\n',
+    'def f(xs):\n    s = 0\n    for x in xs:\n        s += x\n    return s\n',
+    'def f(xs):\n    s = 0\n    i = 0\n    while i < len(xs):\n        s += xs[i]\n        i += 1\n    return s\n',
+    'def f(xs):\n    return sum([x for x in xs if x])\n',
+    'def f(a):\n    try:\n        return 1 / a\n    except ZeroDivisionError:\n        return None\n',
+    'class C:\n    def f(self):\n        return self\n',
+    'def f(a, b):\n    return (a, b) if a else [b, a]\n',
+]
+
+requires_zss = pytest.mark.skipif(importlib.util.find_spec('zss') is None, reason="requires zss")
+
+
+def zss_tree(node):
+    # Former TED.__ast_to_tree
+    from zss import Node
+    if not isinstance(node, ast.AST):
+        return Node(str(node))
+    tree = Node(type(node).__name__)
+    for _, value in ast.iter_fields(node):
+        if isinstance(value, list):
+            for item in value:
+                tree.addkid(zss_tree(item))
+        elif isinstance(value, ast.AST):
+            tree.addkid(zss_tree(value))
+        else:
+            tree.addkid(Node(str(value)))
+    return tree
+
+
+def zss_size(tree) -> int:
+    return 1 + sum(zss_size(child) for child in tree.children)
+
+
+@pytest.fixture(autouse=True)
+def ted_cache():
+    TED.init_cache()
+
+
+@requires_zss
+@pytest.mark.parametrize('code1, code2', list(itertools.product(PROGRAMS, repeat=2)))
+def test_ted(code1, code2):
+    # Distances on postorder arrays are those of zss.simple_distance
+    from zss import simple_distance
+    tree1, tree2 = zss_tree(ast.parse(code1)), zss_tree(ast.parse(code2))
+    distance = simple_distance(tree1, tree2)
+    assert TED.compute_ted(code1, code2) == distance
+    assert TED.compute_sim(code1, code2) == 1 - distance / (zss_size(tree1) + zss_size(tree2))
+    assert TED.relative_patch_size(code1, code2) == round(distance / zss_size(tree1), 2)
+
+
+@pytest.mark.parametrize('code', PROGRAMS)
+def test_cfs(code):
+    # Former TED.get_cfs
+    cfs = [node.__class__.__name__ for node in ast.walk(ast.parse(code))
+           if isinstance(node, (ast.For, ast.While, ast.If, ast.Try, ast.With,
+                                ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+    assert TED.get_cfs(code) == cfs
+
+
+@pytest.mark.parametrize('code1, code2', list(itertools.product(PROGRAMS, repeat=2)))
+def test_lower_bound(code1, code2):
+    assert TED.lower_bound(code1, code2) <= TED.compute_ted(code1, code2)
+
+
+@pytest.mark.parametrize('buggy', PROGRAMS)
+def test_relative_patch_sizes(buggy):
+    # Skipped patches can not be smaller than the best one
+    patches = [patch for patch in PROGRAMS if patch != buggy] + [PROGRAMS[3]]
+    exhaustive = [TED.relative_patch_size(buggy, patch) for patch in patches]
+    sizes = TED.relative_patch_sizes(buggy, patches)
+    assert min(sizes.values()) == min(exhaustive)
+    assert all(exhaustive[i] == size for i, size in sizes.items())
@@ -0,0 +1,202 @@
+import pytest
+
+import src.utils
+from src.execution import Tester, UnitTestStatus
+
+TESTCASES = [{'no': i, 'input': f'f({i})', 'output': str(i * 2)} for i in range(1, 4)]
+CORRECT = 'def f(x):\n    return x + x\n'
+WRONG = 'def f(x):\n    return x * 3\n'
+
+
+@pytest.fixture
+def evaluations(monkeypatch):
+    # Testcases run by Tester.evaluate
+    Tester.init_global_data(TESTCASES)
+    runs = []
+    evaluate = Tester.evaluate
+    def counted(code, testcase, *args):
+        runs.append(testcase.no)
+        return evaluate(code, testcase, *args)
+    monkeypatch.setattr(Tester, 'evaluate', counted)
+    yield runs
+    Tester.shutdown()
+
+
+@pytest.mark.parametrize('code', [CORRECT, WRONG])
+def test_is_solution_after_trace(evaluations, code):
+    test_hist, _, _ = Tester.trace(code)
+    traced = len(evaluations)
+    assert Tester.is_solution(code) == Tester.is_all_pass(test_hist)
+    assert len(evaluations) == traced
+
+
+@pytest.mark.parametrize('code', [CORRECT, WRONG])
+def test_is_solution_after_validation(evaluations, code):
+    test_hist = Tester.validation(code)
+    validated = len(evaluations)
+    assert Tester.is_solution(code) == Tester.is_all_pass(test_hist)
+    assert len(evaluations) == validated
+
+
+def test_validation_after_is_solution(evaluations):
+    assert Tester.is_solution(CORRECT)
+    checked = len(evaluations)
+    assert Tester.validation(CORRECT) == {tc_no: UnitTestStatus.success for tc_no in Tester.get_tc_no_list()}
+    assert len(evaluations) == checked
+
+
+def test_is_solution_stops_at_first_failure(evaluations):
+    assert not Tester.is_solution(WRONG)
+    assert len(evaluations) == 1
+
+
+PROGRAMS = [
+    CORRECT,
+    WRONG,
+    'def f(x):\n    y = 0\n    for i in range(x):\n        y += 2\n    return y\n',
+    'def f(x):\n    return [x][1]\n',
+    'def f(x):\n    while True:\n        x += 1\n',
+    'def f(x):\n    return x + y\n',
+]
+
+
+def run_all(**kwargs) -> list:
+    # Outcomes and traces of every program, recorded values are compared as text
+    Tester.init_global_data(TESTCASES, timeout=0.5, **kwargs)
+    try:
+        outcomes = []
+        for code in PROGRAMS:
+            test_hist, vari_hist, trace_hist = Tester.trace(code)
+            vari_hist = {tc_no: {name: [(str(value), line) for value, line in values]
+                                 for name, values in vari_traces.items()}
+                         for tc_no, vari_traces in vari_hist.items()}
+            trace_hist = {tc_no: (list(exec_traces), exec_traces.truncated)
+                          for tc_no, exec_traces in trace_hist.items()}
+            outcomes.append((Tester.validation(code), test_hist, vari_hist, trace_hist))
+        return outcomes
+    finally:
+        Tester.shutdown()
+
+
+@pytest.fixture(scope='module')
+def serial():
+    return run_all()
+
+
+def test_pool_backend(serial):
+    assert run_all(backend='pool', workers=2) == serial
+
+
+def test_batch_evaluation(serial):
+    assert run_all(batch=True) == serial
+
+
+def test_batch_key_input():
+    # Programs reading stdin have no driver
+    testcases = [{'no': 1, 'input': '3\n4', 'output': '7'}, {'no': 2, 'input': '1\n1', 'output': '3'}]
+    code = 'a = int(input())\nb = int(input())\nc = a + b\nprint(c)\n'
+    outcomes = []
+    for batch in [False, True]:
+        Tester.init_global_data(testcases, batch=batch)
+        test_hist, vari_hist, trace_hist = Tester.trace(code)
+        outcomes.append((test_hist, vari_hist, {tc_no: list(exec_traces) for tc_no, exec_traces in trace_hist.items()}))
+        Tester.shutdown()
+    assert outcomes[0][0] == {1: UnitTestStatus.success, 2: UnitTestStatus.failure}
+    assert outcomes[1] == outcomes[0]
+
+
+def test_disk_cache(tmp_path, monkeypatch, serial):
+    # First run fills the cache, later runs read it back without running a testcase
+    assert run_all(cache_dir=str(tmp_path)) == serial
+    def not_run(*args):
+        raise AssertionError("testcase was run")
+    monkeypatch.setattr(Tester, 'evaluate', not_run)
+    assert run_all(cache_dir=str(tmp_path)) == serial
+    # Traces of other limits are not reused
+    with pytest.raises(AssertionError, match="testcase was run"):
+        run_all(cache_dir=str(tmp_path), trace_limit=10)
+
+
+def test_fork_isolation(serial):
+    assert run_all(isolation='fork') == serial
+
+
+def test_fork_limits():
+    # Memory is limited per run, a blocking call is killed at the wall-clock timeout
+    import time
+    testcases = [{'no': 1, 'input': 'f(1)', 'output': '1'}]
+    Tester.init_global_data(testcases, timeout=0.5, isolation='fork', memory_limit=64)
+    try:
+        assert Tester.is_solution('def f(x):\n    y = bytearray(16 * 1024 * 1024)\n    return x\n')
+        assert not Tester.is_solution('def f(x):\n    y = bytearray(256 * 1024 * 1024)\n    return x\n')
+        start = time.monotonic()
+        assert not Tester.is_solution('import time\ndef f(x):\n    time.sleep(30)\n    return x\n')
+        assert time.monotonic() - start < 5
+    finally:
+        Tester.shutdown()
+
+
+def test_thread_backend(serial):
+    # Testcases of a program run at the same time, each with its own Results
+    assert run_all(backend='thread', workers=3) == serial
+
+
+def test_concurrent_programs(serial):
+    # Programs evaluated from several threads do not share the state of a run
+    from concurrent.futures import ThreadPoolExecutor
+    Tester.init_global_data(TESTCASES, timeout=0.5, backend='thread', workers=3)
+    try:
+        with ThreadPoolExecutor(len(PROGRAMS)) as executor:
+            test_hists = list(executor.map(Tester.validation, PROGRAMS))
+    finally:
+        Tester.shutdown()
+    assert test_hists == [outcomes[0] for outcomes in serial]
+
+
+# Testcases with the driver source each input is run with
+DRIVER_TESTCASES = [
+    ({'no': 1, 'input': 'f(1)', 'output': '2'}, 'print(f(1))'),
+    ({'no': 2, 'input': 'print(f(2))', 'output': '4'}, 'print(f(2))'),
+    ({'no': 3, 'input': 'print(f(1)); print(f(3))', 'output': '2\n6'}, 'print(f(1)); print(f(3))'),
+    ({'no': 4, 'input': 'f(-1)', 'output': '-2'}, 'print(f(-1))'),
+]
+DRIVER_PROGRAMS = [
+    CORRECT,
+    WRONG,
+    'def g(x):\n    return x * 2\n\ndef f(x):\n    y = g(x)\n    return y\n',
+    'class C:\n    def __init__(self, x):\n        self.x = x\n\n    def twice(self):\n        return self.x * 2\n\ndef f(x):\n    return C(x).twice()\n',
+    'def f(x):\n    if x < 0:\n        raise ValueError(x)\n    return x + x\n',
+]
+
+
+@pytest.fixture
+def drivers():
+    Tester.init_global_data([tc for tc, _ in DRIVER_TESTCASES], timeout=0.5)
+    yield {tc['no']: driver for tc, driver in DRIVER_TESTCASES}
+    Tester.shutdown()
+
+
+@pytest.mark.parametrize('code', DRIVER_PROGRAMS)
+def test_gen_test_code(drivers, code):
+    # Program and driver of the testcase are one module, key input programs have no driver
+    from src.utils import CodeCache
+    for testcase in Tester.testsuite:
+        assert Tester.gen_driver(testcase) == drivers[testcase.no]
+        assert Tester.gen_test_code(code, testcase) == CodeCache.regularize(code + '\n\n' + drivers[testcase.no])
+        assert Tester.gen_driver(testcase, key_input=True) is None
+        assert Tester.gen_test_code(code, testcase, key_input=True) == CodeCache.regularize(code.strip())
+
+
+@pytest.mark.parametrize('code', DRIVER_PROGRAMS)
+def test_precompiled_driver(drivers, code):
+    # Precompiled driver after the compiled program gives the results
+    # and trace lines of the program and driver regularized together
+    from src.execution import Tracing
+    def outcome(results):
+        return (results.status, list(results.exec_traces), results.exec_traces.truncated,
+                {name: [(str(value), line) for value, line in values]
+                 for name, values in results.vari_traces.items()})
+    for testcase in Tester.testsuite:
+        concatenated = Tester.run(code, testcase, Tracing)
+        precompiled = Tester.run_compiled(Tester.compile(code), testcase, Tracing)
+        assert outcome(precompiled) == outcome(concatenated)
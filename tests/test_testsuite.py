@@ -0,0 +1,140 @@
+import json
+import pytest
+
+import src.utils
+from src.execution.testsuite import TestSuite
+
+TESTCASES = [{'no': i, 'input': f'f({i})', 'output': str(i * 2)} for i in range(1, 5)]
+
+
+def smoothed_cost(runs:int, fails:int, time:float) -> float:
+    # Average time over the failure rate with one pass and one failure added
+    avg_time = time / runs if runs else 0.0
+    return (avg_time + 1e-3) / ((fails + 1) / (runs + 2))
+
+
+def test_record():
+    testsuite = TestSuite(TESTCASES)
+    testsuite.record(1, True, 0.5)
+    testsuite.record(1, False, 0.25)
+    testsuite.record(2, False)
+    assert testsuite.stats[1] == {'runs': 2, 'fails': 1, 'time': 0.75}
+    assert testsuite.stats[2] == {'runs': 1, 'fails': 1, 'time': 0.0}
+    assert testsuite.stats[3] == testsuite.new_stat()
+
+
+def test_cost():
+    testsuite = TestSuite(TESTCASES)
+    assert testsuite.cost(1) == smoothed_cost(0, 0, 0.0)
+    for passed, elapsed in [(True, 0.1), (False, 0.3), (True, 0.2)]:
+        testsuite.record(1, passed, elapsed)
+    assert testsuite.cost(1) == pytest.approx(smoothed_cost(3, 1, 0.6))
+
+
+def test_ordered_by_cost():
+    testsuite = TestSuite(TESTCASES)
+    # 1 always passes, 2 always fails but is slow, 3 always fails fast,
+    # 4 is unseen and costs no time yet
+    for _ in range(5):
+        testsuite.record(1, True, 0.01)
+        testsuite.record(2, False, 0.5)
+        testsuite.record(3, False, 0.01)
+    costs = {no: testsuite.cost(no) for no in testsuite.get_tc_no_list()}
+    assert [tc.no for tc in testsuite.get_ordered_tcs()] == sorted(costs, key=costs.get) == [4, 3, 1, 2]
+
+
+def test_ordered_ties():
+    # Testcases of equal cost keep the testsuite order
+    testsuite = TestSuite(list(reversed(TESTCASES)))
+    assert [tc.no for tc in testsuite.get_ordered_tcs()] == [1, 2, 3, 4]
+    testsuite.record(3, False, 0.0)
+    assert [tc.no for tc in testsuite.get_ordered_tcs()] == [3, 1, 2, 4]
+
+
+def test_load_save(tmp_path):
+    path = str(tmp_path / 'stats.json')
+    testsuite = TestSuite(TESTCASES)
+    testsuite.load_stats(path)
+    testsuite.record(1, False, 0.5)
+    testsuite.record(2, True, 0.25)
+    testsuite.save_stats(path)
+    stats = {no: dict(stat) for no, stat in testsuite.stats.items()}
+
+    loaded = TestSuite(TESTCASES)
+    loaded.load_stats(path)
+    assert loaded.stats == stats
+    assert [tc.no for tc in loaded.get_ordered_tcs()] == [tc.no for tc in testsuite.get_ordered_tcs()]
+    # Saving again without new runs adds nothing
+    loaded.save_stats(path)
+    with open(path) as f:
+        assert {int(no): stat for no, stat in json.load(f).items()} == stats
+
+
+def test_concurrent_saves(tmp_path):
+    # Each run adds only what it counted since it loaded the file
+    path = str(tmp_path / 'stats.json')
+    first = TestSuite(TESTCASES)
+    first.record(1, False, 1.0)
+    first.save_stats(path)
+
+    run1, run2 = TestSuite(TESTCASES), TestSuite(TESTCASES)
+    run1.load_stats(path)
+    run2.load_stats(path)
+    run1.record(1, True, 0.5)
+    run1.record(2, False, 0.25)
+    run2.record(1, False, 0.125)
+    run2.record(3, True, 0.5)
+    deltas = [{no: {k: run.stats[no][k] - run.saved_stats[no][k] for k in stat}
+               for no, stat in run.stats.items()} for run in [run1, run2]]
+    with open(path) as f:
+        saved = {int(no): stat for no, stat in json.load(f).items()}
+    run1.save_stats(path)
+    run2.save_stats(path)
+
+    with open(path) as f:
+        merged = {int(no): stat for no, stat in json.load(f).items()}
+    expected = {no: {k: saved[no][k] + deltas[0][no][k] + deltas[1][no][k] for k in stat}
+                for no, stat in saved.items()}
+    assert merged == expected
+    assert merged[1] == {'runs': 3, 'fails': 2, 'time': 1.625}
+    # The last run to save holds the merged stats
+    assert run2.stats == merged
+
+
+# Inputs read as key input: no code, or code which does not parse once wrapped in print(...)
+DRIVER_INPUTS = ['f(1)', 'print(f(2))', 'f(1) + f(2)', 'print(f(1)); print(f(2))',
+                 '3\n4', 'hello world', 'import os', 'x = 1; y = 2', 'f(1)\nf(2)']
+
+
+def baseline_gen_driver(input:str) -> str:
+    # Former Tester.gen_driver, parsing the input for every run
+    from src.utils import CodeCache
+    try:
+        test_input = input
+        if 'print(' not in input:
+            test_input = 'print(' + input + ')'
+        CodeCache.regularize(input)
+        CodeCache.regularize(test_input)
+    except:
+        return None
+    return test_input
+
+
+@pytest.mark.parametrize('input', DRIVER_INPUTS)
+def test_compile_drivers(input):
+    from src.utils import CodeCache
+    testcase = TestSuite([{'no': 1, 'input': input, 'output': ''}]).testcases[0]
+    driver_source = baseline_gen_driver(input)
+    assert testcase.key_input == (driver_source is None)
+    assert testcase.driver_source == driver_source
+    if driver_source is None:
+        assert testcase.driver is None
+    else:
+        assert testcase.driver.source == CodeCache.regularize(driver_source)
+
+
+def test_key_inputs():
+    testsuite = TestSuite([{'no': no, 'input': input, 'output': ''} 
+                           for no, input in enumerate(DRIVER_INPUTS, 1)])
+    assert [tc.input for tc in testsuite if tc.key_input] == \
+        ['3\n4', 'hello world', 'import os', 'x = 1; y = 2', 'f(1)\nf(2)']
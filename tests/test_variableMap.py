@@ -0,0 +1,101 @@
+import ast
+import random
+import pytest
+
+import src.utils
+from src.utils import Snapshot, Truncated
+from src.execution import Tester
+from src.transform import VariableMap
+
+
+def baseline_var_map_list(variable_map:VariableMap) -> list:
+    # Former dea_var_map, every pair of variables compared on every testcase
+    def is_cut(hist):
+        return bool(hist) and isinstance(hist[-1], Truncated) and hist[-1].cut
+    def is_equal(object_a, object_b):
+        if not isinstance(object_a, Snapshot) or not isinstance(object_b, Snapshot):
+            return False
+        if object_a.type == object_b.type:
+            return object_a == object_b
+        close_type_list = ['list', 'tuple']
+        if object_a.type in close_type_list and object_b.type in close_type_list:
+            return object_a.items() == object_b.items()
+        return False
+    def is_hist_equal(hist_a, hist_b):
+        if is_cut(hist_a) and is_cut(hist_b):
+            hist_a, hist_b = hist_a[:-1], hist_b[:-1]
+        return len(hist_a) == len(hist_b) and all(map(is_equal, hist_a, hist_b))
+    var_map_list = []
+    for b_var in variable_map.b_var_name_list:
+        for a_var in variable_map.a_var_name_list:
+            for tc_id in variable_map.tc_id_list:
+                if b_var not in variable_map.b_var_hist[tc_id] or a_var not in variable_map.a_var_hist[tc_id]:
+                    continue
+                b_var_values = variable_map.get_var_value_sequence(variable_map.b_var_hist[tc_id][b_var])
+                a_var_values = variable_map.get_var_value_sequence(variable_map.a_var_hist[tc_id][a_var])
+                if is_hist_equal(b_var_values, a_var_values):
+                    var_map_list.append({b_var:a_var})
+                    break
+    return var_map_list
+
+
+def dea_var_map_list(monkeypatch, variable_map:VariableMap) -> list:
+    # Pairs given to get_most_matched_var_map by dea_var_map
+    var_map_lists = []
+    monkeypatch.setattr(variable_map, 'get_most_matched_var_map', var_map_lists.append)
+    variable_map.dea_var_map()
+    return var_map_lists[0]
+
+
+def random_histories():
+    rng = random.Random(0)
+    cut = Truncated(cut=True)
+    values = [Snapshot.take(value, str(value))
+              for value in [0, 1, 1.0, True, 'a', None, [1, 2], (1, 2), [], (), {1: 2}, {1}, frozenset({1})]]
+    values += [Truncated('1234'), Truncated('1234')]
+    for _ in range(100):
+        tc_id_list = list(range(1, rng.randint(1, 3) + 1))
+        var_names = [f'v{i}' for i in range(rng.randint(1, 6))]
+        def hist():
+            # Few values and short histories give many equal pairs
+            hist = [(rng.choice(values[:rng.randint(1, len(values))]), 1) for _ in range(rng.randint(0, 3))]
+            if rng.random() < 0.2: hist.append((cut, 1))
+            return hist
+        def var_hist():
+            return {tc_id: {var: hist() for var in var_names if rng.random() < 0.8}
+                    for tc_id in tc_id_list}
+        yield tc_id_list, var_names, var_hist(), var_hist()
+
+
+@pytest.mark.parametrize('tc_id_list, var_names, a_var_hist, b_var_hist', list(random_histories()))
+def test_dea_var_map(monkeypatch, tc_id_list, var_names, a_var_hist, b_var_hist):
+    variable_map = VariableMap(tc_id_list)
+    variable_map.a_var_name_list = var_names
+    variable_map.b_var_name_list = list(reversed(var_names))
+    variable_map.a_var_hist = a_var_hist
+    variable_map.b_var_hist = b_var_hist
+    assert dea_var_map_list(monkeypatch, variable_map) == baseline_var_map_list(variable_map)
+
+
+TESTCASES = [{'no': i, 'input': f'f({x})', 'output': str(sum(range(x)))} for i, x in enumerate([0, 3, 5], 1)]
+PROGRAMS = [
+    'def f(n):\n    s = 0\n    for i in range(n):\n        s += i\n    return s\n',
+    'def f(n):\n    total, k = 0, 0\n    while k < n:\n        total = total + k\n        k += 1\n    return total\n',
+    'def f(n):\n    xs = list(range(n))\n    t = tuple(xs)\n    return sum(t)\n',
+    'def f(n):\n    ys = [i for i in range(n)]\n    return sum(ys)\n',
+]
+
+
+@pytest.mark.parametrize('value_limit', [Tester.value_limit, 2])
+def test_dea_var_map_traced(monkeypatch, value_limit):
+    # Histories recorded by the tracer, also cut by the value limit
+    Tester.init_global_data(TESTCASES, value_limit=value_limit)
+    try:
+        traced = [(ast.parse(code), Tester.trace(code)[1]) for code in PROGRAMS]
+    finally:
+        Tester.shutdown()
+    for a_tree, a_var_hist in traced:
+        for b_tree, b_var_hist in traced:
+            variable_map = VariableMap(list(a_var_hist))
+            variable_map.update(a_tree, a_var_hist, b_tree, b_var_hist)
+            assert dea_var_map_list(monkeypatch, variable_map) == baseline_var_map_list(variable_map)